@@ -3,6 +3,14 @@
 This module defines a custom graph.
 """
 
-from .graph import graph
+from typing import Any
 
 __all__ = ["graph"]
+
+
+def __getattr__(name: str) -> Any:
+    """首次访问 graph 时才导入并构建图"""
+    if name == "graph":
+        from .graph import get_graph
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,14 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""环境变量引导模块 - 保证 .env 文件在进程内只解析一次"""
+
+from dotenv import load_dotenv
+
+_LOADED = False  # .env 是否已加载
+
+
+def ensure_env_loaded() -> None:
+    """加载 .env 文件(重复调用直接返回, 不覆盖已有环境变量)"""
+    global _LOADED
+    if not _LOADED:
+        load_dotenv(override=False)
+        _LOADED = True
@@ -3,106 +3,193 @@
 
 import os
 import sys
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Tuple
 
-load_dotenv()
+# 作为 agent.agent_config 导入时使用包内相对导入; graph.py 把本目录加入 sys.path 后按顶层模块导入
+if __package__:
+    from ._env_bootstrap import ensure_env_loaded
+else:
+    from _env_bootstrap import ensure_env_loaded
 
+ensure_env_loaded()
 
-@dataclass
-class ModelConfig:
+# 环境变量快照: 只在导入时读取一次 os.environ, 之后统一从字典中取值
+_ENV: Dict[str, str] = os.environ.copy()
+
+
+@lru_cache(maxsize=None)
+def _env_float(key: str, default: str) -> float:
+    """读取浮点型环境变量(解析结果缓存)"""
+    return float(_ENV.get(key, default))
+
+
+@lru_cache(maxsize=None)
+def _env_int(key: str, default: str) -> int:
+    """读取整型环境变量(解析结果缓存)"""
+    return int(_ENV.get(key, default))
+
+
+def _env_flag(key: str, default: str) -> bool:
+    """读取开关型环境变量, 值为 "1" 时视为开启"""
+    return _ENV.get(key, default) == "1"
+
+
+class _FrozenConfig:
+    """只读配置基类: 创建后禁止修改属性, 按 _KEY_FIELDS 字段值比较和哈希"""
+    __slots__ = ()
+    _KEY_FIELDS: Tuple[str, ...] = ()  # 参与比较/哈希的字段
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} 为只读配置, 不能修改属性 {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} 为只读配置, 不能删除属性 {name}")
+
+    def _key(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self._KEY_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+
+_set = object.__setattr__  # 只读配置在 __init__ 中绕过 __setattr__ 赋值
+
+
+class ModelConfig(_FrozenConfig):
     """模型配置类"""
-    name: str  # 模型名称
-    base_url: str  # API 基础 URL
-    api_key: str  # API 密钥
-    temperature: float = 0.1  # 温度参数
-    max_tokens: int = 4096  # 最大 token 数
-    timeout: int = 45  # 超时时间(秒)
+    __slots__ = ("name", "base_url", "api_key", "temperature", "max_tokens", "timeout")
+    _KEY_FIELDS = __slots__
+
+    def __init__(
+        self,
+        name: str,  # 模型名称
+        base_url: str,  # API 基础 URL
+        api_key: str,  # API 密钥
+        temperature: float = 0.1,  # 温度参数
+        max_tokens: int = 4096,  # 最大 token 数
+        timeout: int = 45,  # 超时时间(秒)
+    ) -> None:
+        _set(self, "name", name)
+        _set(self, "base_url", base_url)
+        _set(self, "api_key", api_key)
+        _set(self, "temperature", temperature)
+        _set(self, "max_tokens", max_tokens)
+        _set(self, "timeout", timeout)
 
 
-@dataclass
-class PromptConfig:
+class PromptConfig(_FrozenConfig):
     """提示词配置类"""
-    id: str  # 提示词 ID
-    content: str  # 提示词内容
-    description: str  # 提示词描述
+    __slots__ = ("id", "description", "content")
+    _KEY_FIELDS = __slots__
+
+    def __init__(
+        self,
+        id: str,  # 提示词 ID
+        description: str,  # 提示词描述
+        content: str,  # 提示词内容
+    ) -> None:
+        _set(self, "id", id)
+        _set(self, "description", description)
+        _set(self, "content", content)
 
 
-@dataclass
-class SubAgentConfig:
+class SubAgentConfig(_FrozenConfig):
     """子智能体配置类"""
-    name: str  # 智能体名称
-    description: str  # 智能体描述
-    prompt_id: str  # 使用的提示词 ID
-    model_name: str  # 使用的模型名称
-    tools: List[str] = field(default_factory=list)  # 可用工具列表
-    enabled: bool = True  # 是否启用
+    __slots__ = ("name", "description", "prompt_id", "model_name", "tools", "enabled")
+    _KEY_FIELDS = __slots__
+
+    def __init__(
+        self,
+        name: str,  # 智能体名称
+        description: str,  # 智能体描述
+        prompt_id: str,  # 使用的提示词 ID
+        model_name: str,  # 使用的模型名称
+        tools: Iterable[str] = (),  # 可用工具列表
+        enabled: bool = True,  # 是否启用
+    ) -> None:
+        _set(self, "name", name)
+        _set(self, "description", description)
+        _set(self, "prompt_id", prompt_id)
+        _set(self, "model_name", model_name)
+        _set(self, "tools", tuple(tools))
+        _set(self, "enabled", enabled)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True, repr=False)
 class MCPServerConfig:
     """MCP 服务器配置类"""
     name: str  # 服务器名称
     command: str  # 启动命令
-    args: List[str]  # 命令参数
+    args: Tuple[str, ...]  # 命令参数
     transport: str = "stdio"  # 传输协议
     enabled: bool = True  # 是否启用
 
 
-@dataclass
+@dataclass(frozen=True, slots=True, eq=False, repr=False)  # 含映射字段, 按对象身份哈希
 class AgentSystemConfig:
     """智能体系统总配置类"""
-    models: Dict[str, ModelConfig]  # 模型配置字典
-    prompts: Dict[str, PromptConfig]  # 提示词配置字典
-    sub_agents: Dict[str, SubAgentConfig]  # 子智能体配置字典
-    mcp_servers: Dict[str, MCPServerConfig]  # MCP 服务器配置字典
+    models: Mapping[str, ModelConfig]  # 模型配置(只读映射)
+    prompts: Mapping[str, PromptConfig]  # 提示词配置(只读映射)
+    sub_agents: Mapping[str, SubAgentConfig]  # 子智能体配置(只读映射)
+    mcp_servers: Mapping[str, MCPServerConfig]  # MCP 服务器配置(只读映射)
     supervisor_model: str  # 监督智能体使用的模型名称
     enable_supervisor: bool = True  # 是否启用监督模式
     enable_mcp: bool = False  # 是否启用 MCP
+    enable_parallel_handoff: bool = False  # 监督智能体是否允许一轮并行分派多个子智能体
+    max_concurrency: int = 10  # 同一步中并行执行的子智能体/工具数量上限
+    enable_llm_cache: bool = False  # 是否启用 LLM 响应缓存
+    llm_cache_size: int = 1024  # LLM 响应缓存的最大条目数
 
 
-def get_default_models() -> Dict[str, ModelConfig]:
+_DEFAULT_MODEL_NAME = "ZhipuAI/GLM-4.5"  # 未配置 OPENAI_MODEL 时使用的模型
+_DEFAULT_BASE_URL = "https://api-inference.modelscope.cn/v1"  # 未配置 OPENAI_BASE_URL 时使用的地址
+
+
+def _make_model(name_env: str, temp_env: str, default_temp: str) -> ModelConfig:
+    """根据环境变量构建模型配置, 各模型只有名称和温度不同
+
+    Args:
+        name_env: 模型名称对应的环境变量(未设置时回退到 OPENAI_MODEL)
+        temp_env: 温度参数对应的环境变量
+        default_temp: 默认温度
+    """
+    return ModelConfig(
+        name=_ENV.get(name_env, _ENV.get("OPENAI_MODEL", _DEFAULT_MODEL_NAME)),
+        base_url=_ENV.get("OPENAI_BASE_URL", _DEFAULT_BASE_URL),
+        api_key=_ENV.get("OPENAI_API_KEY", ""),
+        temperature=_env_float(temp_env, default_temp),
+        max_tokens=_env_int("AGENT_MAX_TOKENS", "4096"),
+        timeout=_env_int("AGENT_TIMEOUT", "45"),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_default_models() -> Mapping[str, ModelConfig]:
     """获取默认模型配置"""
-    return {
-        "default": ModelConfig(
-            name=os.getenv("OPENAI_MODEL", "ZhipuAI/GLM-4.5"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api-inference.modelscope.cn/v1"),
-            api_key=os.getenv("OPENAI_API_KEY", ""),
-            temperature=float(os.getenv("AGENT_TEMP_DEFAULT", "0.1")),
-            max_tokens=int(os.getenv("AGENT_MAX_TOKENS", "4096")),
-            timeout=int(os.getenv("AGENT_TIMEOUT", "45")),
-        ),
-        "math": ModelConfig(
-            name=os.getenv("AGENT_MODEL_MATH", os.getenv("OPENAI_MODEL", "ZhipuAI/GLM-4.5")),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api-inference.modelscope.cn/v1"),
-            api_key=os.getenv("OPENAI_API_KEY", ""),
-            temperature=float(os.getenv("AGENT_TEMP_MATH", "0.0")),
-            max_tokens=int(os.getenv("AGENT_MAX_TOKENS", "4096")),
-            timeout=int(os.getenv("AGENT_TIMEOUT", "45")),
-        ),
-        "research": ModelConfig(
-            name=os.getenv("AGENT_MODEL_RESEARCH", os.getenv("OPENAI_MODEL", "ZhipuAI/GLM-4.5")),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api-inference.modelscope.cn/v1"),
-            api_key=os.getenv("OPENAI_API_KEY", ""),
-            temperature=float(os.getenv("AGENT_TEMP_RESEARCH", "0.2")),
-            max_tokens=int(os.getenv("AGENT_MAX_TOKENS", "4096")),
-            timeout=int(os.getenv("AGENT_TIMEOUT", "45")),
-        ),
-        "code": ModelConfig(
-            name=os.getenv("AGENT_MODEL_CODE", os.getenv("OPENAI_MODEL", "ZhipuAI/GLM-4.5")),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api-inference.modelscope.cn/v1"),
-            api_key=os.getenv("OPENAI_API_KEY", ""),
-            temperature=float(os.getenv("AGENT_TEMP_CODE", "0.0")),
-            max_tokens=int(os.getenv("AGENT_MAX_TOKENS", "4096")),
-            timeout=int(os.getenv("AGENT_TIMEOUT", "45")),
-        ),
-    }
+    return MappingProxyType({
+        "default": _make_model("OPENAI_MODEL", "AGENT_TEMP_DEFAULT", "0.1"),
+        "math": _make_model("AGENT_MODEL_MATH", "AGENT_TEMP_MATH", "0.0"),
+        "research": _make_model("AGENT_MODEL_RESEARCH", "AGENT_TEMP_RESEARCH", "0.2"),
+        "code": _make_model("AGENT_MODEL_CODE", "AGENT_TEMP_CODE", "0.0"),
+    })
 
 
-def get_default_prompts() -> Dict[str, PromptConfig]:
+# 子智能体提示词的统一结尾
+_RETURN_TO_SUPERVISOR = "完成任务后,直接返回结果给监督者。"
+
+
+@lru_cache(maxsize=1)
+def get_default_prompts() -> Mapping[str, PromptConfig]:
     """获取默认提示词配置"""
-    return {
+    return MappingProxyType({
         "supervisor": PromptConfig(
             id="supervisor",
             description="监督智能体提示词",
@@ -137,8 +224,7 @@ def get_default_prompts() -> Dict[str, PromptConfig]:
                 "- 注释清晰,位于代码右侧\n"
                 "- 优先考虑性能和可维护性\n"
                 "- 完美支持中文环境\n\n"
-                "完成任务后,直接返回结果给监督者。"
-            ),
+            ) + _RETURN_TO_SUPERVISOR,
         ),
         "math": PromptConfig(
             id="math",
@@ -153,8 +239,7 @@ def get_default_prompts() -> Dict[str, PromptConfig]:
                 "- 只调用一次 calculate 工具\n"
                 "- 表达式不明确时先澄清\n"
                 "- 结果准确,格式清晰\n\n"
-                "完成任务后,直接返回结果给监督者。"
-            ),
+            ) + _RETURN_TO_SUPERVISOR,
         ),
         "research": PromptConfig(
             id="research",
@@ -169,40 +254,14 @@ def get_default_prompts() -> Dict[str, PromptConfig]:
                 "- 信息准确可靠\n"
                 "- 引用来源清晰\n"
                 "- 结果简洁易懂\n\n"
-                "完成任务后,直接返回结果给监督者。"
-            ),
+            ) + _RETURN_TO_SUPERVISOR,
         ),
         "chart": PromptConfig(
             id="chart",
             description="图表智能体提示词",
             content=(
-                "你是一个专业的数据可视化专家,能够根据数据特征自动选择最合适的图表类型。\n\n"
-                "📊 可用图表类型:\n"
-                "- generate_bar_chart: 柱状图 - 适合类别对比\n"
-                "- generate_line_chart: 折线图 - 适合趋势分析\n"
-                "- generate_pie_chart: 饼图 - 适合占比分析\n"
-                "- generate_area_chart: 面积图 - 适合累积趋势\n"
-                "- generate_scatter_chart: 散点图 - 适合相关性分析\n"
-                "- generate_radar_chart: 雷达图 - 适合多维度对比\n"
-                "- generate_funnel_chart: 漏斗图 - 适合流程转化\n"
-                "- generate_column_chart: 条形图 - 适合横向对比\n"
-                "- generate_histogram_chart: 直方图 - 适合分布分析\n"
-                "- generate_boxplot_chart: 箱线图 - 适合统计分析\n"
-                "- generate_sankey_chart: 桑基图 - 适合流向分析\n"
-                "- generate_treemap_chart: 矩形树图 - 适合层级占比\n"
-                "- generate_word_cloud_chart: 词云图 - 适合文本分析\n"
-                "- generate_mind_map: 思维导图 - 适合概念关系\n"
-                "- generate_network_graph: 网络图 - 适合关系网络\n"
-                "- generate_organization_chart: 组织架构图 - 适合层级结构\n"
-                "- generate_flow_diagram: 流程图 - 适合流程展示\n"
-                "- generate_fishbone_diagram: 鱼骨图 - 适合因果分析\n"
-                "- generate_venn_chart: 韦恩图 - 适合集合关系\n"
-                "- generate_dual_axes_chart: 双轴图 - 适合双指标对比\n"
-                "- generate_liquid_chart: 水波图 - 适合进度展示\n"
-                "- generate_violin_chart: 小提琴图 - 适合分布对比\n"
-                "- generate_district_map: 区域地图 - 适合地理分布\n"
-                "- generate_path_map: 路径地图 - 适合路线展示\n"
-                "- generate_pin_map: 标记地图 - 适合位置标注\n\n"
+                "你是一个专业的数据可视化专家,能够根据数据特征自动选择最合适的图表类型。\n"
+                "可用图表工具及其用途见工具列表(generate_* 系列)。\n\n"
                 "🎯 图表选择策略:\n"
                 "1. **趋势分析**: 有时间序列 → 折线图/面积图\n"
                 "2. **类别对比**: 多个类别比较 → 柱状图/条形图\n"
@@ -224,8 +283,7 @@ def get_default_prompts() -> Dict[str, PromptConfig]:
                 "- 数据量过大(>1000行)建议先聚合\n"
                 "- 缺少必要数据时,向用户说明原因\n"
                 "- 优先选择最能体现数据特征的图表类型\n\n"
-                "完成任务后,直接返回结果给监督者。"
-            ),
+            ) + _RETURN_TO_SUPERVISOR,
         ),
         "general": PromptConfig(
             id="general",
@@ -240,21 +298,21 @@ def get_default_prompts() -> Dict[str, PromptConfig]:
                 "- 回答简洁准确\n"
                 "- 态度友好专业\n"
                 "- 中文表达流畅\n\n"
-                "完成任务后,直接返回结果给监督者。"
-            ),
+            ) + _RETURN_TO_SUPERVISOR,
         ),
-    }
+    })
 
 
-def get_default_sub_agents() -> Dict[str, SubAgentConfig]:
+@lru_cache(maxsize=1)
+def get_default_sub_agents() -> Mapping[str, SubAgentConfig]:
     """获取默认子智能体配置"""
-    return {
+    return MappingProxyType({
         "code_agent": SubAgentConfig(
             name="code_agent",
             description="代码生成和分析专家",
             prompt_id="code",
             model_name="code",
-            tools=[],  # 代码智能体暂不需要特定工具
+            tools=(),  # 代码智能体暂不需要特定工具
             enabled=True,
         ),
         "math_agent": SubAgentConfig(
@@ -262,7 +320,7 @@ def get_default_sub_agents() -> Dict[str, SubAgentConfig]:
             description="数学计算专家",
             prompt_id="math",
             model_name="math",
-            tools=["calculate"],
+            tools=("calculate",),
             enabled=True,
         ),
         "research_agent": SubAgentConfig(
@@ -270,7 +328,7 @@ def get_default_sub_agents() -> Dict[str, SubAgentConfig]:
             description="信息检索专家",
             prompt_id="research",
             model_name="research",
-            tools=["search_knowledge"],
+            tools=("search_knowledge",),
             enabled=True,
         ),
         "chart_agent": SubAgentConfig(
@@ -278,7 +336,7 @@ def get_default_sub_agents() -> Dict[str, SubAgentConfig]:
             description="数据可视化专家",
             prompt_id="chart",
             model_name="default",
-            tools=["mcp_chart"],  # MCP 图表工具
+            tools=("mcp_chart",),  # MCP 图表工具
             enabled=True,
         ),
         "general_agent": SubAgentConfig(
@@ -286,56 +344,74 @@ def get_default_sub_agents() -> Dict[str, SubAgentConfig]:
             description="通用助手",
             prompt_id="general",
             model_name="default",
-            tools=["get_current_time", "get_weather"],
+            tools=("get_current_time", "get_weather"),
             enabled=True,
         ),
-    }
+    })
+
 
+# MCP 服务器启动命令(平台在运行期不会变化, 导入时确定一次)
+# Windows 系统需要使用 cmd /c npx，其他系统直接使用 npx
+# 移除 -y 参数以使用全局安装的包,避免 npx 缓存问题
+if sys.platform == "win32":
+    _CHART_CMD = "cmd"
+    _CHART_ARGS: Tuple[str, ...] = ("/c", "npx", "@antv/mcp-server-chart")
+    _BING_CMD = "cmd"
+    _BING_ARGS: Tuple[str, ...] = ("/c", "npx", "bing-cn-mcp")
+else:
+    _CHART_CMD = "npx"
+    _CHART_ARGS = ("@antv/mcp-server-chart",)
+    _BING_CMD = "npx"
+    _BING_ARGS = ("bing-cn-mcp",)
 
-def get_default_mcp_servers() -> Dict[str, MCPServerConfig]:
+
+@lru_cache(maxsize=1)
+def get_default_mcp_servers() -> Mapping[str, MCPServerConfig]:
     """获取默认 MCP 服务器配置"""
-    # Windows 系统需要使用 cmd /c npx，其他系统直接使用 npx
-    # 移除 -y 参数以使用全局安装的包,避免 npx 缓存问题
-    is_windows = sys.platform == "win32"
-
-    if is_windows:
-        chart_command = "cmd"
-        chart_args = ["/c", "npx", "@antv/mcp-server-chart"]  # 移除 -y 参数
-        bing_command = "cmd"
-        bing_args = ["/c", "npx", "bing-cn-mcp"]  # 移除 -y 参数
-    else:
-        chart_command = "npx"
-        chart_args = ["@antv/mcp-server-chart"]  # 移除 -y 参数
-        bing_command = "npx"
-        bing_args = ["bing-cn-mcp"]  # 移除 -y 参数
-
-    return {
+    return MappingProxyType({
         "chart": MCPServerConfig(
             name="chart",
-            command=chart_command,
-            args=chart_args,
+            command=_CHART_CMD,
+            args=_CHART_ARGS,
             transport="stdio",
-            enabled=os.getenv("ENABLE_MCP_CHART", "1") == "1",
+            enabled=_env_flag("ENABLE_MCP_CHART", "1"),
         ),
         "bingcn": MCPServerConfig(
             name="bingcn",
-            command=bing_command,
-            args=bing_args,
+            command=_BING_CMD,
+            args=_BING_ARGS,
             transport="stdio",
-            enabled=os.getenv("ENABLE_MCP_BING", "0") == "1",
+            enabled=_env_flag("ENABLE_MCP_BING", "0"),
         ),
-    }
+    })
 
 
+@lru_cache(maxsize=1)
 def get_agent_config() -> AgentSystemConfig:
-    """获取完整的智能体系统配置"""
+    """获取完整的智能体系统配置(进程内只构建一次)"""
     return AgentSystemConfig(
         models=get_default_models(),
         prompts=get_default_prompts(),
         sub_agents=get_default_sub_agents(),
         mcp_servers=get_default_mcp_servers(),
-        supervisor_model=os.getenv("SUPERVISOR_MODEL", "default"),
-        enable_supervisor=os.getenv("ENABLE_SUPERVISOR", "1") == "1",
-        enable_mcp=os.getenv("ENABLE_MCP", "1") == "1",
+        supervisor_model=sys.intern(_ENV.get("SUPERVISOR_MODEL", "default")),  # 与 models 字典键共享同一对象
+        enable_supervisor=_env_flag("ENABLE_SUPERVISOR", "1"),
+        enable_mcp=_env_flag("ENABLE_MCP", "1"),
+        enable_parallel_handoff=_env_flag("ENABLE_PARALLEL_HANDOFF", "0"),
+        max_concurrency=_env_int("AGENT_MAX_CONCURRENCY", "10"),
+        enable_llm_cache=_env_flag("ENABLE_LLM_CACHE", "0"),
+        llm_cache_size=_env_int("LLM_CACHE_SIZE", "1024"),
     )
 
+
+def reset_agent_config() -> None:
+    """清空配置缓存(用于测试或热更新后重新读取环境变量)"""
+    _ENV.clear()
+    _ENV.update(os.environ)
+    _env_float.cache_clear()
+    _env_int.cache_clear()
+    get_default_models.cache_clear()
+    get_default_prompts.cache_clear()
+    get_default_sub_agents.cache_clear()
+    get_default_mcp_servers.cache_clear()
+    get_agent_config.cache_clear()
@@ -4,8 +4,8 @@
 import os
 import asyncio
 import logging
-from typing import Dict, List, Any
-from langchain_mcp_adapters.client import MultiServerMCPClient
+import threading
+from typing import Any, Coroutine, Dict, List, TypeVar
 from langchain_core.tools import BaseTool
 from agent_config import AgentSystemConfig
 
@@ -14,6 +14,27 @@ logger = logging.getLogger(__name__)
 # 设置环境变量以支持阻塞调用
 os.environ["BG_JOB_ISOLATED_LOOPS"] = "true"
 
+_T = TypeVar("_T")
+
+# 所有 MCP 调用共用的后台事件循环(守护线程中常驻), 避免每次 asyncio.run 新建/销毁事件循环
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """获取后台事件循环, 首次调用时启动"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="mcp-event-loop", daemon=True).start()
+        return _loop
+
+
+def _run_in_loop(coro: Coroutine[Any, Any, _T]) -> _T:
+    """在后台事件循环中执行协程并同步等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
 
 class MCPToolManager:
     """MCP 工具管理器 - 负责 MCP 工具的动态加载和管理"""
@@ -27,6 +48,7 @@ class MCPToolManager:
         self.config = config
         self.mcp_tools: List[BaseTool] = []
         self.mcp_client: Any = None
+        self._by_name: Dict[str, BaseTool] = {}  # 工具名 -> 工具, O(1) 按名查找
         logger.info("MCP 工具管理器初始化")
 
     async def _load_mcp_tools_async(self) -> List[BaseTool]:
@@ -47,7 +69,7 @@ class MCPToolManager:
 
                 server_configs[server_name] = {
                     "command": server_config.command,
-                    "args": server_config.args,
+                    "args": list(server_config.args),
                     "transport": server_config.transport,
                 }
 
@@ -55,8 +77,11 @@ class MCPToolManager:
                 logger.info("ℹ️  没有启用的 MCP 服务器")
                 return []
 
-            # 创建 MCP 客户端
-            self.mcp_client = MultiServerMCPClient(server_configs)
+            # 创建 MCP 客户端(进程内常驻, 重新加载时复用)
+            if self.mcp_client is None:
+                from langchain_mcp_adapters.client import MultiServerMCPClient  # 仅启用 MCP 时才导入
+
+                self.mcp_client = MultiServerMCPClient(server_configs)
 
             # 加载工具
             tools = await self.mcp_client.get_tools()
@@ -79,12 +104,21 @@ class MCPToolManager:
             MCP 工具列表
         """
         try:
-            self.mcp_tools = asyncio.run(self._load_mcp_tools_async())
+            self.mcp_tools = _run_in_loop(self._load_mcp_tools_async())
+            self._build_index()
             return self.mcp_tools
         except Exception as e:
             logger.warning(f"⚠️  同步加载 MCP 工具失败: {e}")
             return []
 
+    def _build_index(self) -> None:
+        """根据当前工具列表重建名称索引(每次加载/重新加载后调用)"""
+        by_name: Dict[str, BaseTool] = {}
+        for tool in self.mcp_tools:
+            # 重名时保留先加载的工具, 与按顺序查找的结果一致
+            by_name.setdefault(getattr(tool, "name", ""), tool)
+        self._by_name = by_name
+
     def get_tools(self) -> List[BaseTool]:
         """获取已加载的 MCP 工具列表"""
         return self.mcp_tools
@@ -98,10 +132,7 @@ class MCPToolManager:
         Returns:
             工具实例,如果不存在则返回 None
         """
-        for tool in self.mcp_tools:
-            if getattr(tool, "name", "") == tool_name:
-                return tool
-        return None
+        return self._by_name.get(tool_name)
 
     def get_tools_by_prefix(self, prefix: str) -> List[BaseTool]:
         """根据前缀获取 MCP 工具列表
@@ -112,6 +143,7 @@ class MCPToolManager:
         Returns:
             匹配的工具列表
         """
+        # 按加载顺序返回全部匹配项(包括重名工具)
         return [
             tool for tool in self.mcp_tools
             if getattr(tool, "name", "").startswith(prefix)
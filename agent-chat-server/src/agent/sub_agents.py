@@ -1,18 +1,39 @@
 # Copyright (c) 2025 左岚. All rights reserved.
 """子智能体系统 - 实现专业化的子智能体"""
 
+import atexit
 import logging
-from typing import Any, Dict, List
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import BaseTool
-from langgraph.prebuilt import create_react_agent
+from functools import lru_cache
+from typing import TYPE_CHECKING, Annotated, Any, Dict, Iterable, List
+import httpx
+from langchain_core.tools import BaseTool, InjectedToolCallId, tool
+from langgraph.graph import MessagesState
+from langgraph.prebuilt import InjectedState, create_react_agent
+from langgraph.types import Command, Send
 from agent_config import AgentSystemConfig, SubAgentConfig, ModelConfig
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 logger = logging.getLogger(__name__)
 
+# 监督智能体和所有子智能体共用的同步 HTTP 连接池, 复用已建立的 TCP/TLS 连接。
+# 异步客户端不做进程级共享: 其连接绑定在事件循环上, 后台任务使用独立事件循环时无法跨循环复用,
+# 由 langchain-openai 自行创建和池化
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+_SHARED_HTTP_CLIENT = httpx.Client(limits=_HTTP_LIMITS)
+atexit.register(_SHARED_HTTP_CLIENT.close)
+
+
+@lru_cache(maxsize=None)
+def create_llm_from_config(model_config: ModelConfig) -> "ChatOpenAI":
+    """根据配置创建 LLM 实例
+
+    按 ModelConfig 的全部字段缓存, 参数完全相同的智能体共用同一个客户端实例。
+    未显式传入 cache 参数, 启用全局 LLM 缓存(set_llm_cache)后相同请求直接命中缓存。
+    """
+    from langchain_openai import ChatOpenAI  # 首次创建 LLM 时才导入
 
-def create_llm_from_config(model_config: ModelConfig) -> ChatOpenAI:
-    """根据配置创建 LLM 实例"""
     return ChatOpenAI(
         model=model_config.name,
         api_key=model_config.api_key,
@@ -20,6 +41,8 @@ def create_llm_from_config(model_config: ModelConfig) -> ChatOpenAI:
         temperature=model_config.temperature,
         max_tokens=model_config.max_tokens,
         timeout=model_config.timeout,
+        streaming=True,  # 流式输出, 降低首个 token 的等待时间
+        http_client=_SHARED_HTTP_CLIENT,
     )
 
 
@@ -38,7 +61,7 @@ class SubAgentFactory:
         self.agents: Dict[str, Any] = {}  # 存储已创建的智能体实例
         logger.info("子智能体工厂初始化完成")
 
-    def _get_tools_for_agent(self, tool_names: List[str]) -> List[BaseTool]:
+    def _get_tools_for_agent(self, tool_names: Iterable[str]) -> List[BaseTool]:
         """根据工具名称列表获取工具实例"""
         tools = []
         for tool_name in tool_names:
@@ -105,7 +128,7 @@ class SubAgentFactory:
             智能体字典 {agent_name: agent_instance}
         """
         logger.info("开始创建所有子智能体...")
-        
+
         for agent_name, agent_config in self.config.sub_agents.items():
             if not agent_config.enabled:
                 logger.info(f"⏭️  子智能体 {agent_name} 已禁用,跳过创建")
@@ -146,6 +169,67 @@ class SubAgentFactory:
         return agent_config.description if agent_config else ""
 
 
+_HANDOFF_TOOL_PREFIX = "transfer_to_"
+
+
+def _handoff_tool_messages(ai_message: Any) -> List[Dict[str, str]]:
+    """为 AI 消息中的全部切换调用构建工具消息(并行分派时使用)
+
+    每个 Send 分支都携带同一组工具消息, 消息 id 由 tool_call_id 确定, 各分支结果合并回父图时
+    按 id 去重, 使每个 tool_call 恰有一条工具消息且紧跟在发起调用的 AI 消息之后。
+    """
+    return [
+        {
+            "role": "tool",
+            "content": f"已将任务分配给 {call['name'].removeprefix(_HANDOFF_TOOL_PREFIX)}",
+            "name": call["name"],
+            "tool_call_id": call["id"],
+            "id": f"handoff-{call['id']}",
+        }
+        for call in ai_message.tool_calls
+    ]
+
+
+def _create_handoff_tool(name: str, description: str, parallel: bool = False) -> BaseTool:
+    """创建切换到指定子智能体的工具
+
+    Args:
+        name: 子智能体名称
+        description: 子智能体描述
+        parallel: 是否允许监督智能体一轮并行调用多个切换工具
+    """
+    tool_name = f"{_HANDOFF_TOOL_PREFIX}{name}"
+    # 工具消息中只有 tool_call_id 随调用变化, 其余字段预先构建
+    message_template = {
+        "role": "tool",
+        "content": f"已将任务分配给 {name}",
+        "name": tool_name,
+    }
+
+    @tool(tool_name, description=f"将任务分配给 {description}")
+    def handoff_tool(
+        state: Annotated[MessagesState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command:
+        """切换到指定的子智能体"""
+        if parallel:
+            # ToolNode 只合并 goto 为 Send 列表的父图命令(并丢弃其 update), 因此并行分派时
+            # 通过 Send 把完整的消息(含全部切换调用的工具消息)直接交给子智能体
+            messages = [*state["messages"], *_handoff_tool_messages(state["messages"][-1])]
+            return Command(goto=[Send(name, {"messages": messages})], graph=Command.PARENT)
+
+        tool_message = {**message_template, "tool_call_id": tool_call_id}
+        # 只提交发起调用的 AI 消息和本次工具消息, 由 messages 的 reducer 追加(按 id 去重),
+        # 不再复制整段对话历史
+        return Command(
+            goto=name,  # 跳转到子智能体节点
+            update={"messages": [state["messages"][-1], tool_message]},
+            graph=Command.PARENT,  # 在父图中导航
+        )
+
+    return handoff_tool
+
+
 def create_handoff_tools(agent_factory: SubAgentFactory):
     """创建智能体切换工具(用于监督智能体调用)
     
@@ -155,45 +239,13 @@ def create_handoff_tools(agent_factory: SubAgentFactory):
     Returns:
         切换工具列表
     """
-    from typing import Annotated
-    from langchain_core.tools import tool, InjectedToolCallId
-    from langgraph.prebuilt import InjectedState
-    from langgraph.graph import MessagesState
-    from langgraph.types import Command
-
     handoff_tools = []
+    parallel = agent_factory.config.enable_parallel_handoff
 
     for agent_name in agent_factory.get_all_agent_names():
         agent_desc = agent_factory.get_agent_description(agent_name)
-        
-        # 动态创建切换工具
-        def create_handoff_tool(name: str, description: str):
-            tool_name = f"transfer_to_{name}"
-            
-            @tool(tool_name, description=f"将任务分配给 {description}")
-            def handoff_tool(
-                state: Annotated[MessagesState, InjectedState],
-                tool_call_id: Annotated[str, InjectedToolCallId],
-            ) -> Command:
-                """切换到指定的子智能体"""
-                tool_message = {
-                    "role": "tool",
-                    "content": f"已将任务分配给 {name}",
-                    "name": tool_name,
-                    "tool_call_id": tool_call_id,
-                }
-                return Command(
-                    goto=name,  # 跳转到子智能体节点
-                    update={**state, "messages": state["messages"] + [tool_message]},
-                    graph=Command.PARENT,  # 在父图中导航
-                )
-            
-            return handoff_tool
-
-        handoff_tool = create_handoff_tool(agent_name, agent_desc)
-        handoff_tools.append(handoff_tool)
-        logger.info(f"✅ 创建切换工具: transfer_to_{agent_name}")
+        handoff_tools.append(_create_handoff_tool(agent_name, agent_desc, parallel))
+        logger.info(f"✅ 创建切换工具: {_HANDOFF_TOOL_PREFIX}{agent_name}")
 
     logger.info(f"📊 切换工具创建完成,共 {len(handoff_tools)} 个工具")
     return handoff_tools
-
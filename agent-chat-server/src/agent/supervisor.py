@@ -3,13 +3,17 @@
 
 import logging
 from typing import Any, List
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import BaseTool
 from langgraph.prebuilt import create_react_agent
-from agent_config import AgentSystemConfig, ModelConfig
+from agent_config import AgentSystemConfig
+from sub_agents import create_llm_from_config
 
 logger = logging.getLogger(__name__)
 
+# 提示词中的分派规则: 默认一次只调用一个切换工具, 开启并行分派后允许同时分配独立子任务
+_SEQUENTIAL_HANDOFF_RULE = "3. 一次只分配给一个智能体,不要并行调用\n"
+_PARALLEL_HANDOFF_RULE = "3. 相互独立的子任务可同时分配给多个智能体,有依赖的任务按顺序分配\n"
+
 
 def create_supervisor_agent(
     config: AgentSystemConfig,
@@ -33,15 +37,11 @@ def create_supervisor_agent(
             logger.error(f"监督智能体模型配置 {model_name} 未找到")
             return None
 
-        # 创建 LLM
-        llm = ChatOpenAI(
-            model=model_config.name,
-            api_key=model_config.api_key,
-            base_url=model_config.base_url,
-            temperature=model_config.temperature,
-            max_tokens=model_config.max_tokens,
-            timeout=model_config.timeout,
-        )
+        # 创建 LLM(与子智能体共用同一构建逻辑和全局响应缓存)
+        llm = create_llm_from_config(model_config)
+        if config.enable_parallel_handoff:
+            # 允许一轮输出多个 transfer_to_* 调用, 切换工具以 Send 分派, 各子智能体在父图中并行执行
+            llm = llm.bind_tools(handoff_tools, parallel_tool_calls=True)
 
         # 获取监督智能体提示词
         prompt_config = config.prompts.get("supervisor")
@@ -49,12 +49,18 @@ def create_supervisor_agent(
             logger.error("监督智能体提示词配置未找到")
             return None
 
-        # 创建监督智能体
+        prompt = prompt_config.content
+        if config.enable_parallel_handoff:
+            prompt = prompt.replace(_SEQUENTIAL_HANDOFF_RULE, _PARALLEL_HANDOFF_RULE)
+
+        # 创建监督智能体; 并行分派时使用 v1 工具节点: 同一轮的全部切换调用在一个 ToolNode 中执行,
+        # 各 Send 合并为一条父图命令。v2 中每个工具调用是独立任务, 只有第一条父图命令生效
         supervisor = create_react_agent(
             model=llm,
             tools=handoff_tools,
-            prompt=prompt_config.content,
+            prompt=prompt,
             name="supervisor",
+            version="v1" if config.enable_parallel_handoff else "v2",
         )
 
         logger.info(
@@ -0,0 +1,253 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""本地工具 - 时间、天气、计算和知识库查询等无需外部服务的工具"""
+
+import ast
+import json
+import logging
+import math
+import operator
+import re
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping
+
+from langchain_core.tools import tool
+
+logger = logging.getLogger(__name__)
+
+
+# ========== 工具数据 ==========
+# 这里使用模拟数据，实际应用中可以接入真实的天气API(只读常量, 导入时构建一次)
+_WEATHER_DATA: Mapping[str, str] = MappingProxyType({
+    "北京": "晴天，气温 15-25°C，微风",
+    "上海": "多云，气温 18-28°C，东南风",
+    "广州": "阴天，气温 22-32°C，有小雨",
+    "深圳": "晴天，气温 24-34°C，南风",
+    "杭州": "多云，气温 16-26°C，微风",
+    "成都": "阴天，气温 12-22°C，有雾",
+})
+_WEATHER_REPLIES: Mapping[str, str] = MappingProxyType(
+    {city: f"{city}的天气：{desc}" for city, desc in _WEATHER_DATA.items()}
+)  # 预先拼好的回复
+_WEATHER_CITIES = "、".join(_WEATHER_DATA)
+
+# 模拟知识库(键均为 casefold 后的形式)
+_KNOWLEDGE_BASE: Mapping[str, str] = MappingProxyType({
+    "python": "Python是一种高级编程语言，由Guido van Rossum于1991年首次发布。它以简洁易读的语法著称。",
+    "人工智能": "人工智能(AI)是计算机科学的一个分支，致力于创建能够执行通常需要人类智能的任务的系统。",
+    "机器学习": "机器学习是人工智能的一个子集，使计算机能够在没有明确编程的情况下学习和改进。",
+    "深度学习": "深度学习是机器学习的一个子集，使用多层神经网络来模拟人脑的工作方式。",
+    "langchain": "LangChain是一个用于开发由语言模型驱动的应用程序的框架，提供了构建LLM应用的工具和抽象。",
+    "langgraph": "LangGraph是LangChain的一部分，用于构建有状态的、多参与者的应用程序，支持循环和条件逻辑。",
+})
+_KNOWLEDGE_PATTERN = re.compile("|".join(map(re.escape, _KNOWLEDGE_BASE)))  # 关键词一次扫描
+
+
+def _build_fragment_index(keys: Iterable[str]) -> Dict[str, str]:
+    """构建 关键词片段 -> 第一个包含该片段的关键词 的索引, 用于查询词本身是关键词一部分的情况"""
+    index: Dict[str, str] = {}
+    for key in keys:
+        for start in range(len(key) + 1):
+            for end in range(start, len(key) + 1):
+                index.setdefault(key[start:end], key)
+    return index
+
+
+_KNOWLEDGE_FRAGMENTS: Mapping[str, str] = MappingProxyType(_build_fragment_index(_KNOWLEDGE_BASE))
+
+# calculate 允许使用的名称(math 模块函数/常量 + abs/round), 导入时构建一次
+_CALC_NAMES: Dict[str, Any] = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
+_CALC_NAMES.update({"abs": abs, "round": round})
+
+_BINARY_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+_MAX_EXPONENT = 10000  # 幂运算指数上限, 防止超大整数运算拖垮进程
+
+
+def _safe_pow(base: Any, exponent: Any) -> Any:
+    """带指数上限的幂运算"""
+    if isinstance(exponent, (int, float)) and abs(exponent) > _MAX_EXPONENT:
+        raise ValueError(f"指数过大: {exponent}")
+    return operator.pow(base, exponent)
+
+
+def _build_sequence(elements: Iterable[ast.AST]) -> Callable[[], list]:
+    """把列表/元组元素或调用参数编译为生成列表的闭包(支持 *iterable 展开)"""
+    parts = [
+        (_build_evaluator(element.value), True) if isinstance(element, ast.Starred)
+        else (_build_evaluator(element), False)
+        for element in elements
+    ]
+
+    def evaluate() -> list:
+        values = []
+        for part, starred in parts:
+            if starred:
+                values.extend(part())
+            else:
+                values.append(part())
+        return values
+
+    return evaluate
+
+
+def _build_evaluator(node: ast.AST) -> Callable[[], Any]:
+    """把表达式语法树编译为闭包, 只接受数字、允许的名称、列表/元组、算术运算和函数调用"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, complex):
+        value = node.value
+        return lambda: value
+    if isinstance(node, ast.Name) and node.id in _CALC_NAMES:
+        value = _CALC_NAMES[node.id]
+        return lambda: value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _build_evaluator(node.left), _build_evaluator(node.right)
+        op = _safe_pow if isinstance(node.op, ast.Pow) else _BINARY_OPS[type(node.op)]
+        return lambda: op(left(), right())
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        operand, op = _build_evaluator(node.operand), _UNARY_OPS[type(node.op)]
+        return lambda: op(operand())
+    if isinstance(node, ast.List):
+        return _build_sequence(node.elts)
+    if isinstance(node, ast.Tuple):
+        elements = _build_sequence(node.elts)
+        return lambda: tuple(elements())
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and callable(_CALC_NAMES.get(node.func.id)):
+        func = _CALC_NAMES[node.func.id]
+        args = _build_sequence(node.args)
+        kwargs = {kw.arg: _build_evaluator(kw.value) for kw in node.keywords if kw.arg}
+        if len(kwargs) != len(node.keywords):
+            raise ValueError("不支持 ** 形式的参数")
+        return lambda: func(*args(), **{k: v() for k, v in kwargs.items()})
+    raise ValueError(f"不支持的表达式: {ast.unparse(node)}")
+
+
+@lru_cache(maxsize=512)
+def _compile_expression(expression: str) -> Callable[[], Any]:
+    """编译数学表达式(相同表达式只解析一次)"""
+    return _build_evaluator(ast.parse(expression.strip(), mode="eval").body)
+
+
+_TIME_FORMAT = "%Y年%m月%d日 %H:%M:%S"  # get_current_time 输出格式
+
+
+@lru_cache(maxsize=1)
+def _format_local_time(epoch_seconds: int) -> str:
+    """格式化本地时间(同一秒内的调用直接复用结果)"""
+    return time.strftime(_TIME_FORMAT, time.localtime(epoch_seconds))
+
+
+@lru_cache(maxsize=256)
+def _get_weather_impl(city: str) -> str:
+    """生成天气回复(模拟数据不变, 结果按城市缓存)"""
+    return _WEATHER_REPLIES.get(city) or f"抱歉，暂时无法获取{city}的天气信息。支持的城市有：{_WEATHER_CITIES}。"
+
+
+@lru_cache(maxsize=256)
+def _search_knowledge_impl(query: str) -> str:
+    """在知识库中查找查询词(知识库不变, 结果按查询词缓存)"""
+    query_folded = query.casefold()  # 统一大小写只做一次
+    # 查询词恰好是关键词: 一次字典查找
+    value = _KNOWLEDGE_BASE.get(query_folded)
+    if value is not None:
+        return f"关于'{query}'的信息：{value}"
+
+    # 用预编译的关键词正则一次扫描查询串, 命中即返回
+    match = _KNOWLEDGE_PATTERN.search(query_folded)
+    if match:
+        return f"关于'{query}'的信息：{_KNOWLEDGE_BASE[match.group(0)]}"
+
+    # 查询词是某个关键词的一部分(如"学习")
+    key = _KNOWLEDGE_FRAGMENTS.get(query_folded)
+    if key is not None:
+        return f"关于'{query}'的信息：{_KNOWLEDGE_BASE[key]}"
+
+    return f"抱歉，知识库中没有找到关于'{query}'的信息。您可以尝试搜索：Python、人工智能、机器学习、深度学习、LangChain、LangGraph等主题。"
+
+
+# ========== 工具定义 ==========
+def log_tool_call(tool_name: str, args: Dict[str, Any]) -> None:
+    """记录工具调用日志(INFO 级别未开启时跳过参数序列化)"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info(f"🔧 工具调用: {tool_name}, 参数: {json.dumps(args, ensure_ascii=False, indent=2)}")
+
+
+@tool
+def get_current_time() -> str:
+    """获取当前时间"""
+    try:
+        result = f"现在的时间是：{_format_local_time(int(time.time()))}"
+        log_tool_call("get_current_time", {})
+        return result
+    except Exception as e:
+        logger.error(f"获取时间失败: {e}")
+        return f"获取时间失败：{str(e)}"
+
+
+@tool
+def get_weather(city: str) -> str:
+    """获取指定城市的天气信息
+
+    Args:
+        city: 城市名称，如"北京"、"上海"、"广州"等
+    """
+    try:
+        log_tool_call("get_weather", {"city": city})
+        return _get_weather_impl(city)
+    except Exception as e:
+        logger.error(f"获取天气失败: {e}")
+        return f"获取天气信息失败：{str(e)}"
+
+
+@tool
+def calculate(expression: str) -> str:
+    """计算数学表达式
+
+    Args:
+        expression: 数学表达式，如"2+3*4"、"sqrt(16)"等
+    """
+    try:
+        log_tool_call("calculate", {"expression": expression})
+
+        # 安全的数学计算，只允许基本运算
+        result = _compile_expression(expression)()
+        return f"计算结果：{expression} = {result}"
+    except Exception as e:
+        logger.error(f"计算失败: {e}")
+        return f"计算错误：{str(e)}。请检查表达式是否正确。"
+
+
+@tool
+def search_knowledge(query: str) -> str:
+    """搜索知识库信息
+
+    Args:
+        query: 搜索关键词
+    """
+    try:
+        log_tool_call("search_knowledge", {"query": query})
+        return _search_knowledge_impl(query)
+    except Exception as e:
+        logger.error(f"知识搜索失败: {e}")
+        return f"知识搜索失败：{str(e)}"
+
+
+# 定义本地工具列表
+LOCAL_TOOLS = [
+    get_current_time,
+    get_weather,
+    calculate,
+    search_knowledge,
+]
@@ -0,0 +1,110 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""SQLCacheManager 的 LRU 淘汰、TTL 过期和按前缀删除测试"""
+
+import pytest
+
+from workflow_sql import cache_manager as cm
+from workflow_sql.cache_manager import SQLCacheManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的单调时钟"""
+    now = [1000.0]
+    monkeypatch.setattr(cm.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SQLCacheManager(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用, b 成为最久未用
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_overwriting_existing_key_does_not_evict():
+    cache = SQLCacheManager(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)
+
+    assert cache.get("a") == 10
+    assert cache.get("b") == 2
+
+
+def test_entry_expires_after_default_ttl(clock):
+    cache = SQLCacheManager(default_ttl=10)
+    cache.set("a", 1)
+
+    clock[0] += 10
+    assert cache.get("a") == 1
+    clock[0] += 0.5
+    assert cache.get("a") is None
+    assert "a" not in cache._cache  # 过期条目在读取时删除
+
+
+def test_entry_uses_its_own_ttl(clock):
+    cache = SQLCacheManager(default_ttl=100)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2)
+
+    clock[0] += 6
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_get_ttl_argument_overrides_entry_ttl(clock):
+    cache = SQLCacheManager(default_ttl=100)
+    cache.set("a", 1)
+
+    clock[0] += 6
+    assert cache.get("a", ttl=5) is None
+
+
+def test_zero_ttl_is_not_replaced_by_default(clock):
+    cache = SQLCacheManager(default_ttl=100)
+    cache.set("a", 1, ttl=0)
+    cache.set("b", 2)
+
+    clock[0] += 0.5
+    assert cache.get("a") is None  # ttl=0 立即过期, 而不是回退到默认TTL
+    assert cache.get("b", ttl=0) is None
+
+
+def test_cleanup_expired_uses_per_entry_ttl(clock):
+    cache = SQLCacheManager(default_ttl=100)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2)
+
+    clock[0] += 6
+    assert cache.cleanup_expired() == 1
+    assert cache.get("long") == 2
+
+
+def test_delete_prefix_removes_only_matching_keys():
+    cache = SQLCacheManager()
+    cache.set("query_1", "r1")
+    cache.set("query_2", "r2")
+    cache.set("schema_all", "s")
+
+    assert cache.delete_prefix("query_") == 2
+    assert cache.get("query_1") is None
+    assert cache.get("query_2") is None
+    assert cache.get("schema_all") == "s"
+    assert cache.delete_prefix("query_") == 0
+
+
+def test_hits_are_counted():
+    cache = SQLCacheManager()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+
+    assert cache.get_stats()["total_accesses"] == 2
@@ -0,0 +1,163 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""SQLDatabaseManager.execute_query 的查询结果缓存与失效规则测试"""
+
+import sqlite3
+
+import pytest
+
+from workflow_sql import cache_manager as cm
+from workflow_sql.cache_manager import CacheKeys, get_cache_manager, initialize_cache
+from workflow_sql.config import DatabaseConfig
+from workflow_sql.database import SQLDatabaseManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """基于内存 SQLite 的数据库管理器, 记录实际执行到数据库的语句"""
+    initialize_cache()  # 每个用例使用独立的全局缓存
+    db_manager = SQLDatabaseManager(DatabaseConfig(uri="sqlite://", query_cache_ttl=30))
+    db_manager.execute_query("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)")
+    db_manager.execute_query("INSERT INTO item (name) VALUES ('a')")
+
+    executed = []
+    run = db_manager.db.run
+
+    def counting_run(query, *args, **kwargs):
+        executed.append(query)
+        return run(query, *args, **kwargs)
+
+    monkeypatch.setattr(db_manager.db, "run", counting_run)
+    db_manager.executed = executed
+    return db_manager
+
+
+def _query_keys():
+    return [key for key in get_cache_manager()._cache if CacheKeys.QUERY_PREFIX in key]
+
+
+def test_repeated_select_is_served_from_cache(manager):
+    first = manager.execute_query("SELECT COUNT(*) FROM item")
+    second = manager.execute_query("SELECT COUNT(*) FROM item")
+
+    assert first == second
+    assert manager.executed == ["SELECT COUNT(*) FROM item"]
+
+
+def test_select_with_cte_is_cached(manager):
+    query = "WITH n AS (SELECT name FROM item) SELECT COUNT(*) FROM n"
+    manager.execute_query(query)
+    manager.execute_query(query)
+
+    assert manager.executed == [query]
+
+
+def test_write_invalidates_cached_results(manager):
+    assert "1" in manager.execute_query("SELECT COUNT(*) FROM item")
+
+    manager.execute_query("INSERT INTO item (name) VALUES ('b')")
+
+    assert _query_keys() == []
+    assert "2" in manager.execute_query("SELECT COUNT(*) FROM item")
+
+
+def test_data_modifying_cte_is_treated_as_write(manager):
+    manager.execute_query("SELECT COUNT(*) FROM item")
+    query = "WITH n AS (SELECT 'c' AS name) INSERT INTO item (name) SELECT name FROM n"
+
+    manager.execute_query(query)
+    manager.execute_query(query)
+
+    assert manager.executed.count(query) == 2  # 写操作每次都执行
+    assert "3" in manager.execute_query("SELECT COUNT(*) FROM item")
+
+
+def test_non_deterministic_query_is_not_cached(manager):
+    manager.execute_query("SELECT random()")
+    manager.execute_query("SELECT random()")
+
+    assert manager.executed == ["SELECT random()", "SELECT random()"]
+    assert _query_keys() == []
+
+
+def test_query_results_use_query_cache_ttl(manager, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cm.time, "monotonic", lambda: now[0])
+    manager.execute_query("SELECT name FROM item")
+
+    now[0] += 31  # 超过 query_cache_ttl, 远小于默认TTL
+    manager.execute_query("SELECT name FROM item")
+
+    assert manager.executed == ["SELECT name FROM item", "SELECT name FROM item"]
+
+
+def _file_manager(path, table, rows):
+    """基于文件 SQLite 的数据库管理器, table 表中有 rows 行"""
+    with sqlite3.connect(path) as connection:  # 连接前建表, SQLDatabase 只识别连接时已有的表
+        connection.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY)")
+        connection.executemany(f"INSERT INTO {table} VALUES (?)", [(i,) for i in range(rows)])
+    return SQLDatabaseManager(DatabaseConfig(uri=f"sqlite:///{path}"))
+
+
+def test_managers_with_same_dialect_do_not_share_cache(tmp_path):
+    initialize_cache()
+    first = _file_manager(tmp_path / "first.db", "item", 1)
+    second = _file_manager(tmp_path / "second.db", "item", 2)
+
+    assert "1" in first.execute_query("SELECT COUNT(*) FROM item")
+    assert "2" in second.execute_query("SELECT COUNT(*) FROM item")
+    assert first.get_table_schema(["item"]) != second.get_table_schema(["item"])
+
+    first.execute_query("INSERT INTO item DEFAULT VALUES")  # 只清除 first 的查询结果缓存
+
+    assert [key for key in _query_keys() if key.startswith(second.cache_scope)] != []
+    assert "2" in first.execute_query("SELECT COUNT(*) FROM item")
+
+
+def test_table_lists_are_cached_per_database(tmp_path):
+    initialize_cache()
+    first = _file_manager(tmp_path / "first.db", "album", 0)
+    second = _file_manager(tmp_path / "second.db", "track", 0)
+
+    assert first.get_table_names() == ["album"]
+    assert second.get_table_names() == ["track"]
+
+    second.invalidate_schema()
+
+    assert get_cache_manager().get(first.cache_scope + CacheKeys.TABLES_LIST) == ["album"]
+
+
+def test_ddl_invalidates_table_and_schema_cache(tmp_path):
+    initialize_cache()
+    manager = _file_manager(tmp_path / "ddl.db", "item", 1)
+    manager.get_table_names()
+    manager.get_table_schema(["item"])
+    scope = manager.cache_scope
+    cache = get_cache_manager()
+    assert cache.get(scope + CacheKeys.TABLES_LIST) is not None
+
+    manager.execute_query("CREATE INDEX idx_item_id ON item (id)")
+
+    assert cache.get(scope + CacheKeys.TABLES_LIST) is None
+    assert cache.get(CacheKeys.table_schema(scope, "item")) is None
+
+
+def test_dml_keeps_table_and_schema_cache(tmp_path):
+    initialize_cache()
+    manager = _file_manager(tmp_path / "dml.db", "item", 1)
+    manager.get_table_schema(["item"])
+
+    manager.execute_query("INSERT INTO item DEFAULT VALUES")
+
+    assert get_cache_manager().get(CacheKeys.table_schema(manager.cache_scope, "item")) is not None
+
+
+def test_schema_ttl_factor_scales_schema_cache_ttl(tmp_path):
+    initialize_cache(ttl=100)
+    path = tmp_path / "factor.db"
+    _file_manager(path, "item", 0)
+    db_manager = SQLDatabaseManager(DatabaseConfig(uri=f"sqlite:///{path}", schema_ttl_factor=3))
+
+    db_manager.get_table_names()
+
+    assert get_cache_manager()._cache[db_manager.cache_scope + CacheKeys.TABLES_LIST].ttl == 300
+    assert DatabaseConfig().schema_ttl_factor == 1
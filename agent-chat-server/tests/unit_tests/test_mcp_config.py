@@ -0,0 +1,29 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""MCP 服务器配置可哈希性测试"""
+
+from workflow_sql.mcp_config import MCPServerConfig, mcp_config
+
+
+def test_server_config_is_hashable():
+    config = MCPServerConfig(
+        name="demo",
+        transport="stdio",
+        command="npx",
+        args=("-y", "demo-server"),
+        env=(("NODE_ENV", "production"),),
+    )
+    same = MCPServerConfig(
+        name="demo",
+        transport="stdio",
+        command="npx",
+        args=("-y", "demo-server"),
+        env=(("NODE_ENV", "production"),),
+    )
+
+    assert hash(config) == hash(same)
+    assert {config: 1}[same] == 1
+
+
+def test_loaded_server_configs_are_hashable():
+    for server in mcp_config.servers.values():
+        hash(server)
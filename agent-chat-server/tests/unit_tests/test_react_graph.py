@@ -0,0 +1,33 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""create_sql_react_agent 启动预热与全局缓存的测试"""
+
+import sqlite3
+from typing import Any
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from workflow_sql.cache_manager import CacheKeys, get_cache_manager, get_cached_tables_list, initialize_cache
+from workflow_sql.config import AgentConfig, DatabaseConfig, LLMConfig, LoggingConfig
+from workflow_sql.react_graph import create_sql_react_agent
+
+
+class _FakeToolModel(GenericFakeChatModel):
+    """绑定工具时返回自身的模型"""
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "_FakeToolModel":
+        return self
+
+
+def test_warm_up_cache_survives_agent_creation(tmp_path):
+    db_path = tmp_path / "warm.db"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE artist (id INTEGER PRIMARY KEY)")
+    initialize_cache()
+    cache = get_cache_manager()
+    config = AgentConfig(DatabaseConfig(uri=f"sqlite:///{db_path}"), LLMConfig(), LoggingConfig())
+
+    create_sql_react_agent(config, _FakeToolModel(messages=iter([AIMessage("完成")])))
+
+    assert get_cache_manager() is cache  # 创建智能体不替换全局缓存
+    assert get_cached_tables_list(CacheKeys.database_scope(config.database.uri)) == ["artist"]
@@ -0,0 +1,57 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""analyze_query_complexity 评分与原始子串计分方式一致性测试"""
+
+import pytest
+
+from workflow_sql.react_tools import _analyze_complexity, analyze_query_complexity
+
+# 原始实现的关键词列表和计分方式(每个关键词做一次子串判断), 作为对照基准
+_BASELINE_SIMPLE = ['多少', 'count', '总数', '数量', '有几个', '列出', 'list', 'show']
+_BASELINE_COMPLEX = ['平均', 'average', '最大', 'max', '最小', 'min', '分组', 'group',
+                     '排序', 'order', '连接', 'join', '比较', '分析', '统计']
+
+
+def _baseline_complexity(question: str) -> str:
+    question_lower = question.lower()
+    simple_score = sum(1 for keyword in _BASELINE_SIMPLE if keyword in question_lower)
+    complex_score = sum(1 for keyword in _BASELINE_COMPLEX if keyword in question_lower)
+    if simple_score > complex_score and simple_score > 0:
+        return "简单"
+    if complex_score > 0:
+        return "复杂"
+    return "中等"
+
+
+@pytest.mark.parametrize(
+    ("question", "expected"),
+    [
+        ("统计总数量", "简单"),               # "总数" 与 "数量" 重叠
+        ("各类别的总数量是多少", "简单"),
+        ("有多少个客户？", "简单"),
+        ("List all albums", "简单"),
+        ("SHOW the COUNT of tracks", "简单"),
+        ("哪种音乐类型的曲目平均时长最长？", "复杂"),
+        ("按国家分组统计客户数量并排序", "复杂"),
+        ("Show max and min order totals", "复杂"),
+        ("列出员工和经理的连接关系", "复杂"),  # 同分时按复杂处理
+        ("介绍一下数据库", "中等"),
+        ("", "中等"),
+    ],
+)
+def test_matches_baseline_scoring(question, expected):
+    assert _baseline_complexity(question) == expected
+    assert analyze_query_complexity.invoke({"question": question}).startswith(f"问题复杂度: {expected}\n")
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["countmax", "listing the maximum", "grouporder", "统计数量总数多少", "比较分析平均值"],
+)
+def test_overlapping_keywords_match_baseline(question):
+    expected = _baseline_complexity(question)
+    assert _analyze_complexity(question.lower()).startswith(f"问题复杂度: {expected}\n")
+
+
+def test_normalization_does_not_change_result():
+    assert analyze_query_complexity.invoke({"question": "  有多少个  客户？ "}) == \
+        analyze_query_complexity.invoke({"question": "有多少个 客户"})
@@ -0,0 +1,116 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""监督智能体一轮并行分派多个子智能体的测试"""
+
+from typing import Any, List
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+import agent_config
+import supervisor
+from agent_config import AgentSystemConfig, ModelConfig, PromptConfig, SubAgentConfig
+from sub_agents import _create_handoff_tool
+
+
+class _FakeToolModel(GenericFakeChatModel):
+    """按顺序返回预设回复的模型, 绑定工具时返回自身"""
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "_FakeToolModel":
+        return self
+
+
+def _sub_agent(name: str):
+    """模拟子智能体: 返回完整消息列表并追加一条回复"""
+    def node(state: MessagesState):
+        return {"messages": [*state["messages"], AIMessage(f"{name} 完成")]}
+    return node
+
+
+def _build_graph(monkeypatch, parallel: bool, responses: List[AIMessage]):
+    model = _FakeToolModel(messages=iter(responses))
+    monkeypatch.setattr(supervisor, "create_llm_from_config", lambda _config: model)
+    config = AgentSystemConfig(
+        models={"default": ModelConfig(name="fake", base_url="", api_key="")},
+        prompts={"supervisor": PromptConfig(id="supervisor", description="", content="分派任务")},
+        sub_agents={
+            name: SubAgentConfig(name=name, description=name, prompt_id="supervisor", model_name="default")
+            for name in ("a", "b")
+        },
+        mcp_servers={},
+        supervisor_model="default",
+        enable_parallel_handoff=parallel,
+    )
+    handoff_tools = [_create_handoff_tool(name, name, parallel) for name in ("a", "b")]
+    supervisor_agent = supervisor.create_supervisor_agent(config, handoff_tools)
+    assert supervisor_agent is not None
+
+    # 与 graph.get_graph 相同的连接方式
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("supervisor", supervisor_agent, destinations=("a", "b", END))
+    for name in ("a", "b"):
+        workflow.add_node(name, _sub_agent(name))
+        workflow.add_edge(name, "supervisor")
+    workflow.add_edge(START, "supervisor")
+    return workflow.compile()
+
+
+def _run(graph) -> List[str]:
+    """运行一轮对话, 返回按执行顺序排列的节点名"""
+    steps: List[str] = []
+    for chunk in graph.stream({"messages": [{"role": "user", "content": "处理任务"}]}, stream_mode="updates"):
+        steps.extend(chunk)
+    return steps
+
+
+def test_parallel_handoff_runs_every_sub_agent(monkeypatch):
+    graph = _build_graph(monkeypatch, parallel=True, responses=[
+        AIMessage("", tool_calls=[
+            {"name": "transfer_to_a", "args": {}, "id": "call_a"},
+            {"name": "transfer_to_b", "args": {}, "id": "call_b"},
+        ]),
+        AIMessage("汇总完成"),
+    ])
+
+    steps = _run(graph)
+
+    # 两个子智能体在同一步中都被执行, 之后只回到监督智能体一次
+    assert steps[0] == "supervisor"
+    assert sorted(steps[1:3]) == ["a", "b"]
+    assert steps[3:] == ["supervisor"]
+
+
+def test_parallel_handoff_history_is_valid_for_next_model_call(monkeypatch):
+    graph = _build_graph(monkeypatch, parallel=True, responses=[
+        AIMessage("", tool_calls=[
+            {"name": "transfer_to_a", "args": {}, "id": "call_a"},
+            {"name": "transfer_to_b", "args": {}, "id": "call_b"},
+        ]),
+        AIMessage("汇总完成"),
+    ])
+
+    messages = graph.invoke({"messages": [{"role": "user", "content": "处理任务"}]})["messages"]
+
+    # 发起调用的 AI 消息之后紧跟每个 tool_call 各一条工具消息, 然后才是子智能体的回复
+    assert [m.type for m in messages[:4]] == ["human", "ai", "tool", "tool"]
+    assert {m.tool_call_id for m in messages[2:4]} == {"call_a", "call_b"}
+    assert sorted(m.content for m in messages[4:6]) == ["a 完成", "b 完成"]
+    assert messages[-1].content == "汇总完成"
+
+
+def test_sequential_handoff(monkeypatch):
+    graph = _build_graph(monkeypatch, parallel=False, responses=[
+        AIMessage("", tool_calls=[{"name": "transfer_to_a", "args": {}, "id": "call_a"}]),
+        AIMessage("完成"),
+    ])
+
+    assert _run(graph) == ["supervisor", "a", "supervisor"]
+
+
+def test_parallel_handoff_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ENABLE_PARALLEL_HANDOFF", raising=False)
+    agent_config.reset_agent_config()
+    try:
+        assert agent_config.get_agent_config().enable_parallel_handoff is False
+    finally:
+        agent_config.reset_agent_config()
@@ -0,0 +1,63 @@
+# Copyright (c) 2025 左岚. All rights reserved.
+"""calculate 工具的安全表达式求值测试"""
+
+import math
+
+import pytest
+
+from agent.tools_local import _compile_expression, calculate
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("2+3*4", 14),
+        ("(2+3)*4", 20),
+        ("-3 + +2", -1),
+        ("7 // 2", 3),
+        ("7 % 4", 3),
+        ("2 ** 10", 1024),
+        ("10 / 4", 2.5),
+        ("sqrt(16)", 4.0),
+        ("pi", math.pi),
+        ("abs(-3)", 3),
+        ("round(2.567, 2)", 2.57),
+        ("round(2.567, ndigits=1)", 2.6),
+        ("fsum([1, 2, 3])", 6.0),
+        ("fsum((1, 2))", 3.0),
+        ("dist((0, 0), (3, 4))", 5.0),
+        ("hypot(*[3, 4])", 5.0),
+        ("hypot(*(3, 4), 0)", 5.0),
+        ("prod([1, *[2, 3], 4])", 24),
+    ],
+)
+def test_supported_expressions(expression, expected):
+    assert _compile_expression(expression)() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "__import__('os')",
+        "open('x')",
+        "'a' * 3",
+        "[x for x in (1, 2)]",
+        "(lambda: 1)()",
+        "sqrt.__class__",
+        "{1: 2}",
+        "round(**{'number': 1.5})",
+    ],
+)
+def test_rejected_expressions(expression):
+    with pytest.raises(ValueError):
+        _compile_expression(expression)
+
+
+def test_large_exponent_is_rejected():
+    with pytest.raises(ValueError):
+        _compile_expression("2 ** 100000")()
+
+
+def test_calculate_tool_formats_result_and_errors():
+    assert calculate.invoke({"expression": "2+3*4"}) == "计算结果：2+3*4 = 14"
+    assert calculate.invoke({"expression": "__import__('os')"}).startswith("计算错误")
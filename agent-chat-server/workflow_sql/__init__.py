@@ -4,23 +4,15 @@
 本模块提供SQL智能体的核心功能。
 """
 
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
+# 导入配置(包内相对导入, 无需修改 sys.path); 图由 get_graph() 在首次调用时才构建
+from .config import get_config, AgentConfig
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+__all__ = ["get_graph", "get_config", "AgentConfig"]
 
-# 导入图和配置
-try:
-    from workflow_sql.graph import graph
-    from workflow_sql.config import get_config, AgentConfig
-    __all__ = ["graph", "get_config", "AgentConfig"]
-except ImportError as e:
-    # 如果导入失败，只导出配置功能
-    from workflow_sql.config import get_config, AgentConfig
-    __all__ = ["get_config", "AgentConfig"]
-    print(f"Warning: Could not import graph: {e}")
+
+def __getattr__(name: str):
+    """延迟导入图模块, 导入本包不再触发 LangChain 依赖加载和图构建"""
+    if name == "get_graph":
+        from .graph import get_graph
+        return get_graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,7 @@
 # Copyright (c) 2025 左岚. All rights reserved.
 """SQL智能体的类型定义模块
 
-本模块定义了SQL智能体应用中使用的核心类型、枚举和异常类。
+本模块定义了SQL智能体应用中使用的核心类型、枚举、异常类和消息辅助函数。
 """
 
 from abc import ABC, abstractmethod
@@ -12,6 +12,19 @@ from langchain_core.messages import BaseMessage
 from langgraph.graph import MessagesState
 
 
+class SQLAgentState(MessagesState, total=False):
+    """SQL工作流状态
+
+    在消息列表之外保存节点产出的结构化数据, 下游节点直接读取, 无需反复解析消息历史。
+    """
+
+    table_names: List[str]  # ListTablesNode 获取的可用表名
+    user_question: str      # 本轮用户问题（ListTablesNode 写入）
+    last_query: str         # 最近执行的SQL查询（CheckQueryNode 写入）
+    last_result: str        # 最近的查询结果（CheckQueryNode 写入）
+    answer: str             # 自然语言答案（AnswerGenerationNode 写入）
+
+
 class DatabaseDialect(Enum):
     """支持的数据库方言枚举"""
 
@@ -51,6 +64,31 @@ class BaseNode(ABC):
         return self.execute(state)
 
 
+def message_text(message: BaseMessage) -> str:
+    """获取消息的文本内容
+
+    字符串内容直接返回; 多段内容(内容块列表)只拼接其中的文本块, 避免把整个列表转成字符串。
+
+    Args:
+        message: 任意 LangChain 消息
+
+    Returns:
+        消息文本
+    """
+    content = message.content
+    if type(content) is str:
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and block.get("type") == "text":
+                parts.append(block.get("text", ""))
+        return "".join(parts)
+    return str(content)
+
+
 # 自定义异常类
 class SQLAgentError(Exception):
     """SQL智能体基础异常类"""
@@ -4,28 +4,85 @@
 本模块提供异步图表生成功能，集成quickchart MCP服务。
 """
 
+import ast
 import asyncio
 import logging
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
 from langgraph.prebuilt import create_react_agent
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.mcp_config import mcp_config  # MCP配置
+from .agent_types import message_text  # 消息文本提取
+from .mcp_config import mcp_config  # MCP配置
 
 logger = logging.getLogger(__name__)
 
 
+# 图表 MCP 服务器在客户端配置中的名称
+_CHART_SERVER_NAME = "chart"
+
+# MCP 连接断开时会抛出的异常, 遇到后丢弃缓存的会话并重连
+_MCP_CONNECTION_ERRORS = (ConnectionError, BrokenPipeError, EOFError)
+_MCP_PING_TIMEOUT = 5.0  # 复用会话前健康检查的超时时间(秒)
+
+# 可能包含图表链接的消息关键词(quickchart.io/https 分别被 chart/http 覆盖), 一次扫描且无需转小写
+_CHART_KEYWORD_PATTERN = re.compile(r'chart|http|图表|可视化', re.IGNORECASE)
+
+# 通用 HTTP/HTTPS URL
+_ANY_URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+', re.IGNORECASE)
+
+# 图表 URL 提取模式(按优先级排列), 导入时编译一次
+_URL_PATTERNS = [
+    # quickchart.io URL
+    re.compile(r'https://quickchart\.io/chart\?c=[A-Za-z0-9%_=-]+', re.IGNORECASE),
+    # 其他图表服务URL
+    re.compile(r'https://[a-zA-Z0-9.-]+/[^\s<>"{}|\\^`\[\]]*chart[^\s<>"{}|\\^`\[\]]*', re.IGNORECASE),
+    # 通用HTTP/HTTPS URL（包含chart关键词）
+    re.compile(r'https?://[^\s<>"{}|\\^`\[\]]*chart[^\s<>"{}|\\^`\[\]]*', re.IGNORECASE),
+    # 任何包含图表相关关键词的URL
+    re.compile(r'https?://[^\s<>"{}|\\^`\[\]]*(?:chart|graph|plot|visual)[^\s<>"{}|\\^`\[\]]*', re.IGNORECASE),
+    # 通用URL模式（作为最后备选）
+    _ANY_URL_PATTERN,
+]
+
+# 图表类型关键词, 每类关键词编译为一个正则, 一次扫描完成匹配
+_LINE_CHART_PATTERN = re.compile(r'趋势|变化|时间|增长')
+_PIE_CHART_PATTERN = re.compile(r'比例|占比|份额')
+
+
+def determine_chart_type(user_question: str) -> str:
+    """根据问题关键词确定图表类型
+
+    Args:
+        user_question: 用户问题
+
+    Returns:
+        图表类型: "line"、"pie" 或 "bar"
+    """
+    if _LINE_CHART_PATTERN.search(user_question):
+        return "line"
+    if _PIE_CHART_PATTERN.search(user_question):
+        return "pie"
+    # 比较、排名类问题以及其他情况都使用柱状图
+    return "bar"
+
+
 class AsyncChartGenerator:
     """异步图表生成器"""
-    
+
+    # 进程内共享的图表 MCP 会话: npx 子进程和 MCP 握手只在首次使用(或断线重连)时执行。
+    # 所有 MCP 相关操作都在后台事件循环(_get_loop)上运行, 会话不会因调用方切换事件循环而被遗弃
+    _mcp_session: Any = None  # 常驻的 MCP ClientSession
+    _mcp_task: Optional[asyncio.Task] = None  # 持有会话上下文的属主任务, 会话在该任务内打开和关闭
+    _mcp_closing: Optional[asyncio.Event] = None  # 通知属主任务退出会话上下文
+    _mcp_tools: Optional[List[Any]] = None  # 绑定在常驻会话上的图表工具
+    _mcp_descriptions: Dict[str, str] = {}  # 工具名 -> 工具描述, 随工具列表一起缓存
+    _mcp_lock: Optional[asyncio.Lock] = None
+    _chart_sem: Optional[asyncio.Semaphore] = None  # 限制同时运行的图表智能体数量
+
     def __init__(self, llm):
         """初始化图表生成器
         
@@ -33,7 +90,146 @@ class AsyncChartGenerator:
             llm: 语言模型实例
         """
         self.llm = llm
-    
+        self._chart_agent: Any = None  # 缓存的图表智能体
+        self._chart_agent_tools: Optional[List[Any]] = None  # 构建缓存智能体时使用的工具列表
+
+    def _get_chart_agent(self, chart_tools: List[Any]) -> Any:
+        """获取图表智能体, 工具列表不变时复用已构建的实例
+
+        Args:
+            chart_tools: 当前 MCP 会话上的图表工具
+
+        Returns:
+            图表 ReAct 智能体
+        """
+        if self._chart_agent is None or self._chart_agent_tools is not chart_tools:
+            # 重连或工具列表变化后工具对象会更新, 此时重新构建智能体
+            self._chart_agent = create_react_agent(
+                model=self.llm,
+                tools=chart_tools,
+                prompt=self._get_system_prompt()
+            )
+            self._chart_agent_tools = chart_tools
+        return self._chart_agent
+
+    @classmethod
+    async def _ensure_mcp_client(cls) -> List[Any]:
+        """获取图表工具, 首次调用时启动 MCP 服务器并保持会话常驻(须在后台事件循环上调用)
+
+        Returns:
+            绑定在常驻会话上的图表工具列表
+        """
+        if cls._mcp_lock is None:
+            cls._mcp_lock = asyncio.Lock()
+            cls._chart_sem = asyncio.Semaphore(mcp_config.chart.max_concurrency)
+
+        async with cls._mcp_lock:
+            if cls._mcp_session is not None:
+                # 健康检查: 子进程退出或管道断开时丢弃旧会话并重连
+                try:
+                    await asyncio.wait_for(cls._mcp_session.send_ping(), timeout=_MCP_PING_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"图表 MCP 会话不可用，重新连接: {e}")
+                    await cls._reset_mcp_client()
+
+            if cls._mcp_session is None:
+                from langchain_mcp_adapters.client import MultiServerMCPClient
+
+                server = mcp_config.get_server_config("mcp-server-chart")
+                client = MultiServerMCPClient({
+                    _CHART_SERVER_NAME: {
+                        "command": server.command,
+                        "args": list(server.args),
+                        "transport": server.transport,
+                        # 订阅服务器通知, 工具列表变化时让缓存失效
+                        "session_kwargs": {"message_handler": cls._on_mcp_message},
+                    }
+                })
+                ready = asyncio.get_running_loop().create_future()
+                closing = asyncio.Event()
+                cls._mcp_task = asyncio.create_task(
+                    cls._own_mcp_session(client, ready, closing), name="chart-mcp-session"
+                )
+                cls._mcp_closing = closing
+                try:
+                    cls._mcp_session = await asyncio.shield(ready)
+                except BaseException:
+                    # 连接失败或调用方被取消: 通知属主任务退出, 由它清理子进程
+                    closing.set()
+                    raise
+                logger.info("图表 MCP 会话已建立")
+
+            if cls._mcp_tools is None:
+                # 工具元数据每个会话只拉取一次, 仅在重连或收到 tools/list_changed 通知后重新获取
+                from langchain_mcp_adapters.tools import load_mcp_tools
+
+                cls._mcp_tools = await load_mcp_tools(cls._mcp_session)
+                cls._mcp_descriptions = {tool.name: tool.description for tool in cls._mcp_tools}
+                logger.info(f"获取 {len(cls._mcp_tools)} 个图表工具")
+        return cls._mcp_tools
+
+    @classmethod
+    async def _own_mcp_session(cls, client: Any, ready: asyncio.Future, closing: asyncio.Event) -> None:
+        """会话属主任务: 在同一个任务内进入并退出 client.session() 上下文
+
+        anyio 的取消作用域要求上下文在进入它的任务中退出, 因此会话的打开和关闭都放在这里,
+        其他任务只通过 closing 事件请求关闭。
+
+        Args:
+            client: MCP 客户端
+            ready: 会话建立后设置为会话对象, 连接失败时设置为异常
+            closing: 置位后退出会话上下文并关闭 MCP 服务器进程
+        """
+        task = asyncio.current_task()
+        try:
+            async with client.session(_CHART_SERVER_NAME) as session:
+                if not ready.done():
+                    ready.set_result(session)
+                    await closing.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"图表 MCP 会话异常结束: {e}")
+        finally:
+            if cls._mcp_task is task:
+                # 会话自行结束(如服务器进程退出)时清空引用, 下次使用时重新连接
+                cls._mcp_session = cls._mcp_tools = cls._mcp_task = cls._mcp_closing = None
+
+    @classmethod
+    async def _on_mcp_message(cls, message: Any) -> None:
+        """处理 MCP 服务器推送的消息: 工具列表变化时清空工具缓存"""
+        from mcp.types import ServerNotification, ToolListChangedNotification
+
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            logger.info("图表 MCP 工具列表已变化，下次调用时重新获取")
+            cls._mcp_tools = None
+
+    @classmethod
+    def get_tool_description(cls, tool_name: str) -> Optional[str]:
+        """获取已缓存的图表工具描述(无需访问 MCP 服务器)"""
+        return cls._mcp_descriptions.get(tool_name)
+
+    @classmethod
+    async def _reset_mcp_client(cls) -> None:
+        """关闭当前 MCP 会话(连接异常后调用, 须在后台事件循环上调用), 下次使用时重新连接"""
+        task, closing = cls._mcp_task, cls._mcp_closing
+        cls._mcp_session = cls._mcp_tools = cls._mcp_task = cls._mcp_closing = None
+        cls._mcp_descriptions = {}
+        if task is not None:
+            # 由属主任务退出会话上下文并关闭 MCP 服务器进程, 关闭时的异常已在属主任务中记录
+            closing.set()
+            await asyncio.gather(task, return_exceptions=True)
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """关闭常驻的图表 MCP 会话(进程退出或会话清理时调用, 可在任意事件循环中调用)"""
+        await _run_on_chart_loop(cls._reset_mcp_client())
+
     def _get_system_prompt(self) -> str:
         """获取图表生成的系统提示"""
         return """
@@ -64,20 +260,20 @@ class AsyncChartGenerator:
 - 生成的图表应该是单一、清晰、不重复的可视化
         """.strip()
     
+    def _prepare_chart_input(self, query_result: str, user_question: str) -> Tuple[str, str]:
+        """确定图表类型并预处理数据(纯 CPU 计算, 与 MCP 连接并发执行)
+
+        Returns:
+            (图表类型, 处理后的数据字符串)
+        """
+        return (
+            self._determine_chart_type(query_result, user_question),
+            self._preprocess_chart_data(query_result),
+        )
+
     def _determine_chart_type(self, query_result: str, user_question: str) -> str:
         """根据数据和问题确定图表类型"""
-        question_lower = user_question.lower()
-        
-        # 根据问题关键词判断
-        if any(word in question_lower for word in ["趋势", "变化", "时间", "增长"]):
-            return "line"
-        elif any(word in question_lower for word in ["比例", "占比", "份额"]):
-            return "pie"
-        elif any(word in question_lower for word in ["比较", "排名", "最", "前", "后"]):
-            return "bar"
-        else:
-            # 默认使用柱状图
-            return "bar"
+        return determine_chart_type(user_question)
     
     async def generate_chart(self, user_question: str, query_result: str, 
                            answer_content: str) -> str:
@@ -91,8 +287,15 @@ class AsyncChartGenerator:
         Returns:
             图表生成结果消息
         """
+        # MCP 会话绑定在后台事件循环上, 调用方在其他事件循环中时转交后台循环执行
+        return await _run_on_chart_loop(
+            self._generate_chart(user_question, query_result, answer_content)
+        )
+
+    async def _generate_chart(self, user_question: str, query_result: str,
+                              answer_content: str) -> str:
+        """在后台事件循环上生成图表(参数与返回值同 generate_chart)"""
         try:
-            import time
             start_time = time.time()
             logger.info("开始异步图表生成")
 
@@ -101,21 +304,12 @@ class AsyncChartGenerator:
                 logger.info("图表生成功能已禁用")
                 return "图表生成功能当前不可用"
 
-            # 获取图表工具 - 使用简化的直接方式
+            # 获取图表工具(复用常驻的 MCP 会话)的同时, 在线程中完成图表类型判断和数据预处理
             try:
-                from langchain_mcp_adapters.client import MultiServerMCPClient
-
-                # 按照 agent/graph.py 的成功实现方式
-                client = MultiServerMCPClient({
-                    "chart": {
-                        "command": "npx",
-                        "args": ["-y", "@antv/mcp-server-chart"],
-                        "transport": "stdio"
-                    }
-                })
-
-                chart_tools = await client.get_tools()
-                logger.info(f"成功获取 {len(chart_tools)} 个图表工具")
+                chart_tools, (chart_type, processed_data) = await asyncio.gather(
+                    self._ensure_mcp_client(),
+                    asyncio.to_thread(self._prepare_chart_input, query_result, user_question),
+                )
 
                 if not chart_tools:
                     logger.error("未找到图表生成工具")
@@ -125,8 +319,6 @@ class AsyncChartGenerator:
                 logger.error(f"获取图表工具失败: {e}")
                 return f"图表生成失败：无法获取图表工具 - {str(e)}"
 
-            # 确定图表类型
-            chart_type = self._determine_chart_type(query_result, user_question)
             logger.info(f"选择图表类型: {chart_type}")
             
             # 构建提示消息
@@ -134,9 +326,6 @@ class AsyncChartGenerator:
                 "role": "system",
                 "content": self._get_system_prompt(),
             }
-            
-            # 预处理数据，确保去重
-            processed_data = self._preprocess_chart_data(query_result)
 
             user_message = {
                 "role": "user",
@@ -161,31 +350,36 @@ class AsyncChartGenerator:
                 """.strip()
             }
             
-            # 使用LLM和图表工具生成图表
-            chart_agent = create_react_agent(
-                model=self.llm,
-                tools=chart_tools,
-                prompt=self._get_system_prompt()
-            )
+            # 使用LLM和图表工具生成图表(复用已构建的智能体)
+            chart_agent = self._get_chart_agent(chart_tools)
             
             # 调用图表智能体（添加超时机制）
             agent_start = time.time()
             logger.info("开始调用图表智能体")
 
+            timeout = mcp_config.chart.timeout_seconds
             try:
-                # 设置60秒超时
-                import asyncio
-                result = await asyncio.wait_for(
-                    chart_agent.ainvoke({
+                # 限制并发的图表生成数, 避免大量请求同时涌入 MCP 服务器
+                async with self._chart_sem:
+                    agent_task = asyncio.ensure_future(chart_agent.ainvoke({
                         "messages": [system_message, user_message]
-                    }),
-                    timeout=60.0
-                )
+                    }))
+                    try:
+                        result = await asyncio.wait_for(asyncio.shield(agent_task), timeout=timeout)
+                    except (asyncio.TimeoutError, asyncio.CancelledError):
+                        # 显式取消并等待任务结束, 确保超时(或外部取消)后不再有工具调用继续占用 MCP 服务器
+                        agent_task.cancel()
+                        await asyncio.gather(agent_task, return_exceptions=True)
+                        raise
                 agent_time = time.time() - agent_start
                 logger.info(f"图表智能体调用完成，耗时: {agent_time:.2f}秒")
             except asyncio.TimeoutError:
                 logger.error("图表生成超时")
-                return "图表生成失败：操作超时（60秒）"
+                return f"图表生成失败：操作超时（{timeout:g}秒）"
+            except _MCP_CONNECTION_ERRORS as e:
+                logger.error(f"图表 MCP 连接已断开，下次调用将重新连接: {e}")
+                await self._reset_mcp_client()
+                return f"图表生成失败：{str(e)}"
             except Exception as e:
                 logger.error(f"图表智能体调用失败: {e}")
                 return f"图表生成失败：{str(e)}"
@@ -196,30 +390,27 @@ class AsyncChartGenerator:
 
             # 遍历所有消息，查找工具调用结果
             for i, message in enumerate(result["messages"]):
-                if hasattr(message, 'content') and message.content:
-                    content_str = str(message.content)
-                    logger.debug(f"消息 {i}: {content_str[:200]}...")  # 调试日志
+                if getattr(message, 'content', None):
+                    content_str = message_text(message)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"消息 {i}: {content_str[:200]}...")  # 调试日志
 
                     # 检查是否包含图表链接（扩展检测范围）
                     if chart_url is None:
                         # 检查多种可能的图表链接格式
-                        if any(keyword in content_str.lower() for keyword in [
-                            "quickchart.io", "chart", "http", "https", "图表", "可视化"
-                        ]):
+                        if _CHART_KEYWORD_PATTERN.search(content_str):
                             chart_url = self._extract_chart_url(content_str)
                             if chart_url:
                                 logger.info(f"找到图表链接: {chart_url[:100]}...")
                             else:
                                 # 尝试提取任何HTTP链接
-                                import re
-                                url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-                                urls = re.findall(url_pattern, content_str)
-                                if urls:
-                                    chart_url = urls[0]
+                                url_match = _ANY_URL_PATTERN.search(content_str)
+                                if url_match:
+                                    chart_url = url_match.group(0)
                                     logger.info(f"提取到URL: {chart_url[:100]}...")
 
                     # 如果是最终的AI消息，保存描述
-                    if hasattr(message, 'type') and message.type == 'ai':
+                    if getattr(message, 'type', None) == 'ai':
                         chart_description = message.content
 
             # 构建最终结果
@@ -247,64 +438,39 @@ class AsyncChartGenerator:
 
     def _extract_chart_url(self, content: str) -> str:
         """从内容中提取图表URL"""
-        import re
-
         # 尝试多种URL模式
-        patterns = [
-            # quickchart.io URL
-            r'https://quickchart\.io/chart\?c=[A-Za-z0-9%_=-]+',
-            # 其他图表服务URL
-            r'https://[a-zA-Z0-9.-]+/[^\s<>"{}|\\^`\[\]]*chart[^\s<>"{}|\\^`\[\]]*',
-            # 通用HTTP/HTTPS URL（包含chart关键词）
-            r'https?://[^\s<>"{}|\\^`\[\]]*chart[^\s<>"{}|\\^`\[\]]*',
-            # 任何包含图表相关关键词的URL
-            r'https?://[^\s<>"{}|\\^`\[\]]*(?:chart|graph|plot|visual)[^\s<>"{}|\\^`\[\]]*',
-            # 通用URL模式（作为最后备选）
-            r'https?://[^\s<>"{}|\\^`\[\]]+'
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            if matches:
+        for pattern in _URL_PATTERNS:
+            match = pattern.search(content)
+            if match:
                 # 返回第一个匹配的URL，并清理尾部字符
-                url = matches[0].rstrip('.,;!?)')
-                logger.debug(f"使用模式 '{pattern}' 提取到URL: {url[:100]}...")
+                url = match.group(0).rstrip('.,;!?)')
+                logger.debug(f"使用模式 '{pattern.pattern}' 提取到URL: {url[:100]}...")
                 return url
 
         return None
 
     def _validate_chart_url(self, url: str) -> bool:
         """验证图表URL是否有效"""
+        # 检查URL长度（太短可能无效）
+        if len(url) < 20:
+            return False
+
         try:
-            # 基本URL格式检查
-            if not url.startswith(('http://', 'https://')):
-                return False
-
-            # 检查URL长度（太短可能无效）
-            if len(url) < 20:
-                return False
-
-            # 对于quickchart.io，检查特定参数
-            if 'quickchart.io' in url:
-                if 'chart?c=' not in url:
-                    return False
-                # 检查是否包含必要的参数
-                    if '%22type%22' not in url or '%22data%22' not in url:
-                        return False
-
-            # 对于其他图表服务，进行基本验证
-            else:
-                # 检查是否包含图表相关关键词
-                chart_keywords = ['chart', 'graph', 'plot', 'visual', 'data']
-                if not any(keyword in url.lower() for keyword in chart_keywords):
-                    logger.debug(f"URL不包含图表关键词: {url}")
-                    # 仍然返回True，因为可能是其他类型的图表服务
-                    pass
-
-            return True
-        except Exception:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+
+        # 基本URL格式检查
+        if parts.scheme not in ("http", "https") or not parts.netloc:
             return False
 
+        # 对于quickchart.io，必须带有图表配置参数 c
+        if parts.hostname and parts.hostname.endswith("quickchart.io"):
+            return "c" in parse_qs(parts.query)
+
+        # 其他图表服务只做格式校验
+        return True
+
     def _generate_chart_description(self) -> str:
         """生成图表描述"""
         return """
@@ -329,9 +495,6 @@ class AsyncChartGenerator:
             处理后的数据字符串
         """
         try:
-            import ast
-            import re
-
             # 尝试解析查询结果
             if query_result.strip().startswith('['):
                 # 如果是列表格式，直接解析
@@ -382,8 +545,6 @@ class AsyncChartGenerator:
     def _extract_data_from_text(self, text: str) -> list:
         """从文本中提取数据"""
         try:
-            import re
-
             # 尝试匹配元组格式: ('name', value)
             tuple_pattern = r"\('([^']+)',\s*([0-9.]+)\)"
             matches = re.findall(tuple_pattern, text)
@@ -406,6 +567,55 @@ class AsyncChartGenerator:
             return []
 
 
+# 同步调用共用的后台事件循环(守护线程中常驻): 常驻的 MCP 会话绑定在该循环上, 跨调用保持可用
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """获取后台事件循环, 首次调用时启动"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chart-event-loop", daemon=True).start()
+        return _loop
+
+
+_generators: Dict[int, AsyncChartGenerator] = {}  # id(llm) -> 图表生成器(生成器持有 llm, id 不会被复用)
+
+
+async def _run_on_chart_loop(coro: Any) -> Any:
+    """在后台事件循环上运行协程并等待结果
+
+    Args:
+        coro: 要运行的协程
+
+    Returns:
+        协程的返回值
+    """
+    loop = _get_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    # 调用方被取消时, wrap_future 会把取消传递给后台循环中的任务
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def get_chart_generator(llm) -> AsyncChartGenerator:
+    """获取与语言模型对应的图表生成器, 同一个 llm 复用同一实例(及其缓存的图表智能体)
+
+    Args:
+        llm: 语言模型实例
+
+    Returns:
+        图表生成器
+    """
+    generator = _generators.get(id(llm))
+    if generator is None:
+        generator = _generators[id(llm)] = AsyncChartGenerator(llm)
+    return generator
+
+
 def run_async_chart_generation(llm, user_question: str, query_result: str,
                               answer_content: str) -> str:
     """运行异步图表生成（同步包装器）
@@ -420,20 +630,13 @@ def run_async_chart_generation(llm, user_question: str, query_result: str,
         图表生成结果消息
     """
     try:
-        # 创建新的事件循环或使用现有的
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        # 创建图表生成器并运行
-        generator = AsyncChartGenerator(llm)
-        result = loop.run_until_complete(
-            generator.generate_chart(user_question, query_result, answer_content)
+        # 获取(复用)图表生成器, 提交到后台事件循环运行并同步等待结果
+        generator = get_chart_generator(llm)
+        future = asyncio.run_coroutine_threadsafe(
+            generator._generate_chart(user_question, query_result, answer_content),
+            _get_loop(),
         )
-
-        return result
+        return future.result()
 
     except Exception as e:
         logger.error(f"异步图表生成包装器错误: {e}")
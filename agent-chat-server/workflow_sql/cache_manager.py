@@ -4,30 +4,33 @@
 本模块提供高效的数据库信息缓存机制，避免重复获取相同信息。
 """
 
+import hashlib
 import logging
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from threading import Lock
 from typing import Dict, List, Optional, Any
 
 logger = logging.getLogger(__name__)
 
+try:
+    import xxhash  # 可选依赖, 短字符串哈希比 blake2b 更快
+except ImportError:
+    xxhash = None
+
 
 @dataclass
 class CacheEntry:
     """缓存条目数据类"""
     data: Any
     timestamp: float
-    access_count: int = 0
+    ttl: float  # 条目自身的生存时间（秒）
     
-    def is_expired(self, ttl_seconds: int) -> bool:
+    def is_expired(self, ttl_seconds: float) -> bool:
         """检查缓存是否过期"""
-        return time.time() - self.timestamp > ttl_seconds
-    
-    def access(self) -> Any:
-        """访问缓存数据，更新访问计数"""
-        self.access_count += 1
-        return self.data
+        return time.monotonic() - self.timestamp > ttl_seconds
 
 
 class SQLCacheManager:
@@ -42,8 +45,9 @@ class SQLCacheManager:
         """
         self.default_ttl = default_ttl
         self.max_entries = max_entries
-        self._cache: Dict[str, CacheEntry] = {}
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()  # 按最近访问顺序排列, 队首最久未用
         self._lock = Lock()
+        self._hits = 0  # 累计命中次数(仅用于统计, 不参与淘汰)
         
         logger.info(f"SQL缓存管理器初始化 - TTL: {default_ttl}秒, 最大条目: {max_entries}")
     
@@ -52,43 +56,47 @@ class SQLCacheManager:
         
         Args:
             key: 缓存键
-            ttl: 自定义TTL，如果为None则使用默认TTL
+            ttl: 自定义TTL，如果为None则使用写入时为条目设置的TTL
             
         Returns:
             缓存的数据，如果不存在或已过期则返回None
         """
+        # 查找、过期删除、更新访问顺序和命中计数都在锁内完成, 与 set/淘汰互斥
         with self._lock:
-            if key not in self._cache:
+            entry = self._cache.get(key)
+            if entry is None:
                 logger.debug(f"缓存未命中: {key}")
                 return None
-            
-            entry = self._cache[key]
-            ttl = ttl or self.default_ttl
-            
-            if entry.is_expired(ttl):
+
+            if entry.is_expired(entry.ttl if ttl is None else ttl):
                 logger.debug(f"缓存已过期: {key}")
                 del self._cache[key]
                 return None
-            
-            logger.debug(f"缓存命中: {key} (访问次数: {entry.access_count + 1})")
-            return entry.access()
+
+            self._cache.move_to_end(key)  # 标记为最近使用
+            self._hits += 1
+        logger.debug(f"缓存命中: {key}")
+        return entry.data
     
-    def set(self, key: str, data: Any) -> None:
+    def set(self, key: str, data: Any, ttl: Optional[float] = None) -> None:
         """设置缓存数据
         
         Args:
             key: 缓存键
             data: 要缓存的数据
+            ttl: 该条目的生存时间（秒），如果为None则使用默认TTL
         """
         with self._lock:
-            # 如果缓存已满，清理最少使用的条目
-            if len(self._cache) >= self.max_entries:
+            # 如果缓存已满，清理最久未使用的条目(覆盖已有键时无需清理)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif len(self._cache) >= self.max_entries:
                 self._evict_lru()
             
             self._cache[key] = CacheEntry(
                 data=data,
-                timestamp=time.time(),
-                access_count=0
+                timestamp=time.monotonic(),
+                ttl=self.default_ttl if ttl is None else ttl
             )
             logger.debug(f"缓存已设置: {key}")
     
@@ -108,6 +116,23 @@ class SQLCacheManager:
                 return True
             return False
     
+    def delete_prefix(self, prefix: str) -> int:
+        """删除所有以指定前缀开头的缓存条目
+        
+        Args:
+            prefix: 缓存键前缀
+            
+        Returns:
+            删除的条目数量
+        """
+        with self._lock:
+            keys = [key for key in self._cache if key.startswith(prefix)]
+            for key in keys:
+                del self._cache[key]
+            if keys:
+                logger.debug(f"按前缀删除缓存: {prefix} ({len(keys)} 个条目)")
+            return len(keys)
+    
     def clear(self) -> None:
         """清空所有缓存"""
         with self._lock:
@@ -116,41 +141,39 @@ class SQLCacheManager:
             logger.info(f"已清空所有缓存 ({count} 个条目)")
     
     def _evict_lru(self) -> None:
-        """清理最少使用的缓存条目"""
+        """清理最久未使用的缓存条目(O(1))"""
         if not self._cache:
             return
         
-        # 找到访问次数最少的条目
-        lru_key = min(self._cache.keys(), 
-                     key=lambda k: self._cache[k].access_count)
-        del self._cache[lru_key]
+        lru_key, _ = self._cache.popitem(last=False)
         logger.debug(f"LRU清理: {lru_key}")
     
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, detailed: bool = True) -> Dict[str, Any]:
         """获取缓存统计信息
         
+        Args:
+            detailed: 是否统计命中次数、过期条目和键列表(后两项需要遍历所有条目)
+            
         Returns:
             包含缓存统计信息的字典
         """
         with self._lock:
-            total_entries = len(self._cache)
-            total_accesses = sum(entry.access_count for entry in self._cache.values())
-            
-            # 计算过期条目数
-            current_time = time.time()
-            expired_count = sum(
-                1 for entry in self._cache.values()
-                if entry.is_expired(self.default_ttl)
-            )
-            
-            return {
-                "total_entries": total_entries,
-                "expired_entries": expired_count,
-                "total_accesses": total_accesses,
+            stats: Dict[str, Any] = {
+                "total_entries": len(self._cache),
                 "max_entries": self.max_entries,
                 "default_ttl": self.default_ttl,
-                "cache_keys": list(self._cache.keys())
             }
+            if not detailed:
+                return stats
+            
+            now = time.monotonic()
+            stats["expired_entries"] = sum(
+                1 for entry in self._cache.values()
+                if now - entry.timestamp > entry.ttl
+            )
+            stats["total_accesses"] = self._hits
+            stats["cache_keys"] = list(self._cache.keys())
+            return stats
     
     def cleanup_expired(self) -> int:
         """清理所有过期的缓存条目
@@ -159,10 +182,11 @@ class SQLCacheManager:
             清理的条目数量
         """
         with self._lock:
-            current_time = time.time()
+            # 只取一次当前时间, 逐条按各自的TTL比较, 不再每个条目调用 is_expired()/time.monotonic()
+            now = time.monotonic()
             expired_keys = [
                 key for key, entry in self._cache.items()
-                if entry.is_expired(self.default_ttl)
+                if now - entry.timestamp > entry.ttl
             ]
             
             for key in expired_keys:
@@ -202,59 +226,113 @@ def initialize_cache(ttl: int = 3600, max_entries: int = 100) -> None:
     logger.info("全局SQL缓存管理器已初始化")
 
 
+# 空结果(没有表、没有表结构)也缓存, 但只保留较短时间, 以便数据库配置修正后尽快生效
+_EMPTY_RESULT_TTL = 60
+
+
+def _schema_ttl(cache_manager: SQLCacheManager, data: Any, ttl_factor: float) -> float:
+    """表结构类缓存条目的生存时间（秒）: 默认TTL乘以 ttl_factor, 空结果使用较短的TTL"""
+    if not data:
+        return _EMPTY_RESULT_TTL
+    return cache_manager.default_ttl * ttl_factor
+
+
 # 缓存键常量
 class CacheKeys:
-    """缓存键常量类"""
+    """缓存键常量类
+
+    全局缓存由所有数据库管理器共享, 每个键都以 database_scope(uri) 生成的前缀开头,
+    不同数据库(即使方言相同)的表列表、表结构和查询结果互不覆盖。
+    """
     TABLES_LIST = "tables_list"
+    TABLES_TEXT = "tables_text"  # 逗号拼接后的表列表, 供工具直接返回
     DATABASE_INFO = "database_info"
+    SCHEMA_PREFIX = "schema_"
+    QUERY_PREFIX = "query_"
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def database_scope(uri: str) -> str:
+        """由数据库连接字符串生成缓存键前缀(使用哈希, 避免连接字符串中的密码出现在缓存键中)"""
+        return f"db_{CacheKeys.hash_query(uri)}:"
     
     @staticmethod
-    def table_schema(table_names: str) -> str:
+    def table_schema(scope: str, table_names: str) -> str:
         """生成表结构缓存键"""
-        return f"schema_{table_names}" if table_names else "schema_all"
+        return f"{scope}{CacheKeys.SCHEMA_PREFIX}{table_names or 'all'}"
     
     @staticmethod
-    def query_result(query_hash: str) -> str:
+    def query_result(scope: str, query_hash: str) -> str:
         """生成查询结果缓存键"""
-        return f"query_{query_hash}"
+        return f"{scope}{CacheKeys.QUERY_PREFIX}{query_hash}"
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def hash_query(sql: str) -> str:
+        """计算SQL语句的哈希值, 用作 query_result 的参数
+        
+        结果只作为缓存键而非安全摘要, 64 位足以区分不同查询, 因此使用
+        xxh3_64(已安装 xxhash 时)或 8 字节的 blake2b, 而不是 sha256。
+        """
+        data = sql.encode("utf-8")
+        if xxhash is not None:
+            return xxhash.xxh3_64_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
 
 
-def cache_tables_list(tables: List[str]) -> None:
-    """缓存表列表"""
+def cache_tables_list(scope: str, tables: List[str], ttl_factor: float = 1.0) -> None:
+    """缓存表列表(同时缓存拼接好的字符串, 命中时无需重复拼接)"""
     cache_manager = get_cache_manager()
-    cache_manager.set(CacheKeys.TABLES_LIST, tables)
+    ttl = _schema_ttl(cache_manager, tables, ttl_factor)
+    cache_manager.set(scope + CacheKeys.TABLES_LIST, tables, ttl=ttl)
+    cache_manager.set(scope + CacheKeys.TABLES_TEXT, ", ".join(tables), ttl=ttl)
 
 
-def get_cached_tables_list() -> Optional[List[str]]:
+def get_cached_tables_list(scope: str) -> Optional[List[str]]:
     """获取缓存的表列表"""
     cache_manager = get_cache_manager()
-    return cache_manager.get(CacheKeys.TABLES_LIST)
+    return cache_manager.get(scope + CacheKeys.TABLES_LIST)
+
+
+def get_cached_tables_text(scope: str) -> Optional[str]:
+    """获取缓存的表列表字符串(以逗号分隔)"""
+    cache_manager = get_cache_manager()
+    return cache_manager.get(scope + CacheKeys.TABLES_TEXT)
 
 
-def cache_table_schema(table_names: str, schema: str) -> None:
+def cache_table_schema(scope: str, table_names: str, schema: str, ttl_factor: float = 1.0) -> None:
     """缓存表结构信息"""
     cache_manager = get_cache_manager()
-    key = CacheKeys.table_schema(table_names)
-    cache_manager.set(key, schema)
+    key = CacheKeys.table_schema(scope, table_names)
+    cache_manager.set(key, schema, ttl=_schema_ttl(cache_manager, schema, ttl_factor))
 
 
-def get_cached_table_schema(table_names: str) -> Optional[str]:
+def get_cached_table_schema(scope: str, table_names: str) -> Optional[str]:
     """获取缓存的表结构信息"""
     cache_manager = get_cache_manager()
-    key = CacheKeys.table_schema(table_names)
+    key = CacheKeys.table_schema(scope, table_names)
     return cache_manager.get(key)
 
 
-def cache_database_info(info: str) -> None:
+def invalidate_schema_cache(scope: str) -> None:
+    """清除指定数据库的表列表、所有表结构和数据库信息缓存(数据库结构变更后调用)"""
+    cache_manager = get_cache_manager()
+    cache_manager.delete(scope + CacheKeys.TABLES_LIST)
+    cache_manager.delete(scope + CacheKeys.TABLES_TEXT)
+    cache_manager.delete(scope + CacheKeys.DATABASE_INFO)  # 其中包含表数量
+    cache_manager.delete_prefix(scope + CacheKeys.SCHEMA_PREFIX)
+
+
+def cache_database_info(scope: str, info: str, ttl_factor: float = 1.0) -> None:
     """缓存数据库信息"""
     cache_manager = get_cache_manager()
-    cache_manager.set(CacheKeys.DATABASE_INFO, info)
+    cache_manager.set(scope + CacheKeys.DATABASE_INFO, info, ttl=_schema_ttl(cache_manager, info, ttl_factor))
 
 
-def get_cached_database_info() -> Optional[str]:
+def get_cached_database_info(scope: str) -> Optional[str]:
     """获取缓存的数据库信息"""
     cache_manager = get_cache_manager()
-    return cache_manager.get(CacheKeys.DATABASE_INFO)
+    return cache_manager.get(scope + CacheKeys.DATABASE_INFO)
 
 
 def clear_all_cache() -> None:
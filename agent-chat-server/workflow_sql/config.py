@@ -7,6 +7,7 @@
 import logging
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -18,6 +19,12 @@ logger = logging.getLogger(__name__)
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 # 构建数据库文件的绝对路径
 _DEFAULT_DB_PATH = os.path.join(_CURRENT_DIR, "Chinook.db")
+# .env文件的查找位置（按优先级排列）
+_ENV_SEARCH_PATHS = (
+    os.path.join(_CURRENT_DIR, ".env"),        # workflow_sql/.env
+    os.path.join(_CURRENT_DIR, "..", ".env"),  # agent-chat-server/.env
+    ".env",                                    # 当前目录
+)
 
 
 @dataclass
@@ -27,6 +34,11 @@ class DatabaseConfig:
     uri: str = f"sqlite:///{_DEFAULT_DB_PATH}"  # 数据库连接字符串（绝对路径）
     max_query_results: int = 5         # 查询结果最大条数
     timeout_seconds: int = 30          # 查询超时时间（秒）
+    pool_size: int = 10                # 连接池常驻连接数
+    max_overflow: int = 20             # 连接池允许的额外连接数
+    pool_recycle: int = 1800           # 连接回收时间（秒），避免使用被服务端关闭的连接
+    query_cache_ttl: int = 60          # 只读查询结果的缓存时间（秒），外部写入最多在此时间后可见
+    schema_ttl_factor: float = 1.0     # 表名、表结构和数据库信息的缓存时间相对默认缓存TTL的倍数
 
 
 @dataclass
@@ -65,14 +77,7 @@ class AgentConfig:
         """
         # 尝试加载.env文件
         try:
-            # 查找.env文件的可能位置
-            env_paths = [
-                os.path.join(os.path.dirname(__file__), ".env"),  # workflow_sql/.env
-                os.path.join(os.path.dirname(__file__), "..", ".env"),  # agent-chat-server/.env
-                ".env"  # 当前目录
-            ]
-
-            for env_path in env_paths:
+            for env_path in _ENV_SEARCH_PATHS:
                 if os.path.exists(env_path):
                     load_dotenv(env_path)
                     logger.info(f"✅ 加载环境变量文件: {env_path}")
@@ -89,7 +94,12 @@ class AgentConfig:
         db_config = DatabaseConfig(
             uri=os.getenv("DB_URI", f"sqlite:///{_DEFAULT_DB_PATH}"),
             max_query_results=int(os.getenv("DATABASE_MAX_QUERY_RESULTS", "5")),
-            timeout_seconds=int(os.getenv("DATABASE_TIMEOUT_SECONDS", "30"))
+            timeout_seconds=int(os.getenv("DATABASE_TIMEOUT_SECONDS", "30")),
+            pool_size=int(os.getenv("DATABASE_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", "20")),
+            pool_recycle=int(os.getenv("DATABASE_POOL_RECYCLE", "1800")),
+            query_cache_ttl=int(os.getenv("DATABASE_QUERY_CACHE_TTL", "60")),
+            schema_ttl_factor=float(os.getenv("DATABASE_SCHEMA_TTL_FACTOR", "1"))
         )
 
         # 语言模型配置
@@ -118,10 +128,18 @@ class AgentConfig:
         )
 
 
+@lru_cache(maxsize=1)
 def get_config() -> AgentConfig:
     """获取全局配置实例
 
+    首次调用时解析 .env 和环境变量, 之后复用同一实例。
+
     Returns:
         从环境变量加载的AgentConfig实例
     """
     return AgentConfig.from_env()
+
+
+def reset_config() -> None:
+    """清除缓存的配置实例, 下次调用 get_config() 时重新加载（用于测试或环境变量变更后）"""
+    get_config.cache_clear()
@@ -4,26 +4,61 @@
 本模块提供数据库连接管理和SQL操作功能。
 """
 
+import asyncio
 import logging
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
-from typing import List, Optional
+import re
+from typing import Any, Dict, List, Optional
 
 from langchain_community.utilities import SQLDatabase
+from sqlalchemy.pool import StaticPool
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.config import DatabaseConfig  # 数据库配置类
-from workflow_sql.agent_types import DatabaseConnectionError, DatabaseDialect, QueryExecutionError  # 异常和类型定义
+from .config import DatabaseConfig  # 数据库配置类
+from .agent_types import DatabaseConnectionError, DatabaseDialect, QueryExecutionError  # 异常和类型定义
+from .cache_manager import (  # 数据库信息缓存
+    CacheKeys,
+    cache_table_schema,
+    cache_tables_list,
+    get_cache_manager,
+    get_cached_table_schema,
+    get_cached_tables_list,
+    invalidate_schema_cache,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# 方言子串 -> 数据库方言, 按顺序匹配第一个命中项
+_DIALECT_MAP = (
+    ("sqlite", DatabaseDialect.SQLITE),
+    ("postgres", DatabaseDialect.POSTGRESQL),
+    ("mysql", DatabaseDialect.MYSQL),
+    ("mssql", DatabaseDialect.MSSQL),
+    ("sqlserver", DatabaseDialect.MSSQL),
+    ("oracle", DatabaseDialect.ORACLE),
+)
+
+# 可缓存结果的只读查询(SELECT / WITH ... SELECT)
+_READ_QUERY_PATTERN = re.compile(r"\s*(select|with)\b", re.IGNORECASE)
+
+# 数据修改关键字: 以 SELECT/WITH 开头的语句仍可能修改数据(如 PostgreSQL 的
+# WITH d AS (DELETE ... RETURNING *) SELECT ...), 包含这些关键字时按写操作处理
+_WRITE_KEYWORD_PATTERN = re.compile(r"\b(insert|update|delete|merge)\b", re.IGNORECASE)
+
+# 表结构变更语句, 执行后表列表和表结构缓存随之失效
+_DDL_PATTERN = re.compile(r"\s*(create|alter|drop)\b", re.IGNORECASE)
+
+# 每次执行结果都可能不同的函数, 包含它们的查询不缓存
+_NON_DETERMINISTIC_PATTERN = re.compile(
+    r"\b(random|rand|now|current_timestamp|current_date|current_time|sysdate|getdate|newid|uuid)\b",
+    re.IGNORECASE,
+)
+
+# 各数据库"表不存在"错误的特征文本, 命中说明缓存的表结构可能已过期
+_MISSING_TABLE_PATTERN = re.compile(
+    r"no such table|does(?: not|n't) exist|invalid object name|unknown table",
+    re.IGNORECASE,
+)
+
 
 class SQLDatabaseManager:
     """SQL数据库管理器"""
@@ -37,6 +72,10 @@ class SQLDatabaseManager:
         self.config = config
         self._db: Optional[SQLDatabase] = None
         self._dialect: Optional[DatabaseDialect] = None
+        self._query_cache_hits = 0     # 查询结果缓存命中次数(仅用于调试日志)
+        self._query_cache_lookups = 0  # 查询结果缓存查找次数
+        self._warmed_up = False        # 是否已预热连接
+        self.cache_scope = CacheKeys.database_scope(config.uri)  # 本数据库在全局缓存中的键前缀
 
     @property
     def db(self) -> SQLDatabase:
@@ -51,6 +90,7 @@ class SQLDatabaseManager:
             logger.info(f"连接数据库: {self.config.uri}")
             self._db = SQLDatabase.from_uri(
                 self.config.uri,
+                engine_args=self._engine_args(),  # 连接池配置
                 max_string_length=10000,      # 最大字符串长度
                 include_tables=None,          # 包含所有表
                 sample_rows_in_table_info=3   # 表信息中的示例行数
@@ -61,6 +101,29 @@ class SQLDatabaseManager:
             logger.error(f"数据库连接失败 - URI: {self.config.uri}, 错误: {e}")  # 增强错误日志
             raise DatabaseConnectionError(f"数据库连接失败: {e}") from e
 
+    def _engine_args(self) -> Dict[str, Any]:
+        """构建SQLAlchemy引擎参数(连接池配置)
+
+        Returns:
+            传给 create_engine 的关键字参数
+        """
+        uri = self.config.uri
+        if uri.startswith("sqlite"):
+            # SQLite 连接建立成本低, 但需要允许在不同工作线程中使用同一连接
+            engine_args: Dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+            if uri in ("sqlite://", "sqlite:///:memory:"):
+                # 内存数据库只存在于单个连接中, 必须所有线程共享同一连接
+                engine_args["poolclass"] = StaticPool
+            return engine_args
+
+        return {
+            "pool_size": self.config.pool_size,
+            "max_overflow": self.config.max_overflow,
+            "pool_timeout": self.config.timeout_seconds,
+            "pool_pre_ping": True,                     # 取用前探活, 自动替换已断开的连接
+            "pool_recycle": self.config.pool_recycle,
+        }
+
     def _detect_dialect(self) -> DatabaseDialect:
         """检测数据库方言"""
         if self._db is None:
@@ -68,19 +131,12 @@ class SQLDatabaseManager:
 
         dialect_str = self._db.dialect.lower()
 
-        if "sqlite" in dialect_str:
-            return DatabaseDialect.SQLITE
-        elif "postgresql" in dialect_str or "postgres" in dialect_str:
-            return DatabaseDialect.POSTGRESQL
-        elif "mysql" in dialect_str:
-            return DatabaseDialect.MYSQL
-        elif "mssql" in dialect_str or "sqlserver" in dialect_str:
-            return DatabaseDialect.MSSQL
-        elif "oracle" in dialect_str:
-            return DatabaseDialect.ORACLE
-        else:
-            logger.warning(f"未知方言: {dialect_str}，默认使用SQLite")
-            return DatabaseDialect.SQLITE
+        for needle, dialect in _DIALECT_MAP:
+            if needle in dialect_str:
+                return dialect
+
+        logger.warning(f"未知方言: {dialect_str}，默认使用SQLite")
+        return DatabaseDialect.SQLITE
 
     def get_dialect(self) -> DatabaseDialect:
         """获取数据库方言"""
@@ -89,11 +145,19 @@ class SQLDatabaseManager:
         return self._dialect
 
     def get_table_names(self) -> List[str]:
-        """获取可用表名列表"""
+        """获取可用表名列表
+
+        表名保存在带TTL的共享缓存中, 过期后重新读取, 新建的表最多在TTL到期后可见;
+        表结构变更时也可调用 invalidate_schema 立即清除。
+        """
         try:
-            tables = self.db.get_usable_table_names()
-            logger.debug(f"获取表名成功 - 共 {len(tables)} 个表: {tables}")  # 优化日志格式
-            return tables
+            tables = get_cached_tables_list(self.cache_scope)
+            if tables is None:
+                tables = list(self.db.get_usable_table_names())
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"获取表名成功 - 共 {len(tables)} 个表: {tables}")  # 优化日志格式
+                cache_tables_list(self.cache_scope, tables, self.config.schema_ttl_factor)
+            return list(tables)
         except Exception as e:
             logger.error(f"获取表名失败 - 错误详情: {e}")  # 统一错误日志格式
             raise QueryExecutionError(f"获取表名失败: {e}") from e
@@ -107,15 +171,53 @@ class SQLDatabaseManager:
         Returns:
             查询结果字符串
         """
+        debug = logger.isEnabledFor(logging.DEBUG)  # 关闭 DEBUG 时跳过日志字符串的切片和格式化
         try:
-            logger.debug(f"开始执行SQL查询: {query[:100]}...")  # 限制日志中查询长度
+            # 只缓存结果确定的只读查询, 键由数据库前缀和SQL哈希组成
+            cache_manager = get_cache_manager()
+            cache_key = None
+            is_read = (
+                _READ_QUERY_PATTERN.match(query) is not None
+                and _WRITE_KEYWORD_PATTERN.search(query) is None
+            )
+            if is_read and not _NON_DETERMINISTIC_PATTERN.search(query):
+                cache_key = CacheKeys.query_result(self.cache_scope, CacheKeys.hash_query(query))
+                cached = cache_manager.get(cache_key)
+                self._query_cache_lookups += 1
+                if cached is not None:
+                    self._query_cache_hits += 1
+                    if debug:
+                        logger.debug(f"使用缓存的查询结果 (命中率: {self._query_cache_hits}/{self._query_cache_lookups}): {query[:100]}...")
+                    return cached
+
+            if debug:
+                logger.debug(f"开始执行SQL查询: {query[:100]}...")  # 限制日志中查询长度
             result = self.db.run(query)
-            logger.debug(f"SQL查询执行成功 - 结果长度: {len(str(result))} 字符")  # 优化成功日志
+            if debug:
+                # 结果通常已是字符串, 其他类型只记录类型名, 避免为计算长度整体转成字符串
+                size = f"{len(result)} 字符" if isinstance(result, str) else type(result).__name__
+                logger.debug(f"SQL查询执行成功 - 结果长度: {size}")  # 优化成功日志
+            if cache_key is not None:
+                # 查询结果使用较短的TTL, 其他进程写入的数据在TTL到期后即可见
+                cache_manager.set(cache_key, result, ttl=self.config.query_cache_ttl)
+            elif not is_read:
+                # 写操作(DML/DDL)可能改变数据, 丢弃本数据库缓存的所有查询结果
+                cache_manager.delete_prefix(CacheKeys.query_result(self.cache_scope, ""))
+                if _DDL_PATTERN.match(query):
+                    self.invalidate_schema()
             return result
         except Exception as e:
             logger.error(f"SQL查询执行失败 - 查询: {query[:50]}..., 错误: {e}")  # 增强错误日志
+            if _MISSING_TABLE_PATTERN.search(str(e)):
+                # 表已被删除或重命名, 丢弃缓存的表列表和表结构, 下次获取时重新读取
+                self.invalidate_schema()
             raise QueryExecutionError(f"查询执行失败: {e}") from e
 
+    def invalidate_schema(self) -> None:
+        """清除缓存的表名和表结构, 下次获取时重新查询数据库"""
+        invalidate_schema_cache(self.cache_scope)
+        logger.info("已清除表名和表结构缓存")
+
     def get_table_schema(self, table_names: Optional[List[str]] = None) -> str:
         """获取指定表的结构信息
 
@@ -128,11 +230,92 @@ class SQLDatabaseManager:
         try:
             if table_names is None:
                 table_names = self.get_table_names()
+            else:
+                # 去重后排序: 同一组表不论顺序和重复都合并为一次批量查询、命中同一条缓存
+                table_names = sorted(set(table_names))
+
+            cache_key = ",".join(sorted(table_names))
+            cached = get_cached_table_schema(self.cache_scope, cache_key)
+            if cached is not None:
+                return cached
 
-            logger.debug(f"获取表结构: {table_names}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"获取表结构: {table_names}")
             schema = self.db.get_table_info(table_names=table_names)
             logger.debug(f"表结构获取成功，长度: {len(schema)}")
+            cache_table_schema(self.cache_scope, cache_key, schema, self.config.schema_ttl_factor)
             return schema
         except Exception as e:
             logger.error(f"获取表结构失败: {e}")
             raise QueryExecutionError(f"获取表结构失败: {e}") from e
+
+    def warm_up(self) -> None:
+        """预热数据库连接: 建立连接、缓存表名, 并预先打开连接池中的连接
+
+        失败时只记录警告, 首次查询时会按原有逻辑重新连接。
+        """
+        if self._warmed_up:
+            return
+
+        try:
+            tables = self.get_table_names()
+
+            if not self.config.uri.startswith("sqlite"):
+                # 同时签出多个连接再归还, 迫使连接池预先建立这些物理连接
+                engine = self.db._engine
+                connections = [engine.connect() for _ in range(min(self.config.pool_size, 4))]
+                for connection in connections:
+                    connection.close()
+
+            self._warmed_up = True
+            logger.info(f"数据库连接预热完成 - 共 {len(tables)} 个表")
+        except Exception as e:
+            logger.warning(f"数据库连接预热失败，将在首次查询时重试: {e}")
+
+    # ========== 异步接口 ==========
+    # 在工作线程中调用同步实现: 复用同一个连接池和查询缓存, 异步节点并发查询时不阻塞事件循环
+
+    async def aget_table_names(self) -> List[str]:
+        """get_table_names 的异步版本"""
+        return await asyncio.to_thread(self.get_table_names)
+
+    async def aexecute_query(self, query: str) -> str:
+        """execute_query 的异步版本
+
+        Args:
+            query: 要执行的SQL查询
+
+        Returns:
+            查询结果字符串
+        """
+        return await asyncio.to_thread(self.execute_query, query)
+
+    async def aget_table_schema(self, table_names: Optional[List[str]] = None) -> str:
+        """get_table_schema 的异步版本
+
+        Args:
+            table_names: 要获取结构的表名列表，如果为None则获取所有表
+
+        Returns:
+            表结构信息字符串
+        """
+        return await asyncio.to_thread(self.get_table_schema, table_names)
+
+
+# 进程内共享的数据库管理器(按连接URI区分), 同一数据库只创建一个引擎和连接池
+_MANAGERS: Dict[str, SQLDatabaseManager] = {}
+
+
+def get_database_manager(config: DatabaseConfig) -> SQLDatabaseManager:
+    """获取数据库管理器, 相同URI复用同一实例
+
+    Args:
+        config: 数据库配置
+
+    Returns:
+        SQLDatabaseManager实例
+    """
+    manager = _MANAGERS.get(config.uri)
+    if manager is None:
+        manager = _MANAGERS[config.uri] = SQLDatabaseManager(config)
+    return manager
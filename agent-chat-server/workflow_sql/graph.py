@@ -6,36 +6,31 @@
 
 import logging
 import os
-# 修复相对导入问题，使用绝对导入
 import sys
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-# 使用绝对导入
-from workflow_sql.config import get_config  # 配置获取函数
-from workflow_sql.react_graph import create_sql_react_agent  # ReAct智能体
-from workflow_sql.logging_config import setup_logging  # 日志配置
-from langgraph.graph import StateGraph, MessagesState, END
+# 按文件路径加载时(LangGraph CLI / 直接运行脚本)没有包上下文, 需要把包的上级目录加入路径;
+# 作为 workflow_sql.graph 导入时无需修改 sys.path
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
 
+from functools import cache
+from typing import Any
 
-# 初始化配置
-config = get_config()
+# 使用绝对导入(兼容按文件路径加载)
+from workflow_sql.config import get_config  # 配置获取函数
 
-# 设置日志
-setup_logging(config.logging)
 logger = logging.getLogger(__name__)
 
-# 设置API密钥到环境变量
-if config.llm.api_key:
-    os.environ[f"{config.llm.provider.upper()}_API_KEY"] = config.llm.api_key
+# 全局变量存储智能体实例
+_react_agent = None
+
 
 # 真实的模型初始化函数
 def init_chat_model(model_string: str):
     """初始化聊天模型"""
+    config = get_config()
     try:
         # 尝试导入并初始化模型
         from langchain_openai import ChatOpenAI
@@ -57,115 +52,139 @@ def init_chat_model(model_string: str):
             return None
 
     except ImportError:
-        logger.warning("langchain_openai 未安装，使用模拟模型")
-        # 创建一个模拟的LLM对象
-        class MockLLM:
-            def __init__(self):
-                self.model_name = model_string
-
-            def invoke(self, messages):
-                return "模拟响应：请安装 langchain_openai 以使用真实模型"
-
-        return MockLLM()
+        logger.error("langchain_openai 未安装，无法初始化语言模型")
+        return None
     except Exception as e:
         logger.error(f"模型初始化失败: {e}")
         return None
 
-# 初始化语言模型
-try:
-    llm = init_chat_model(f"{config.llm.provider}:{config.llm.model}")
-    if llm:
-        logger.info(f"语言模型初始化成功: {config.llm.provider}:{config.llm.model}")
-    else:
-        logger.warning("语言模型初始化失败，将使用模拟模型")
-except Exception as e:
-    logger.error(f"语言模型初始化失败: {e}")
-    llm = None
 
-# 全局变量存储智能体实例
-_react_agent = None
+def _build_message_graph(node_name: str, node: Any) -> Any:
+    """构建只包含单个节点的标准消息图"""
+    from langgraph.graph import StateGraph, MessagesState, END
+
+    workflow = StateGraph(MessagesState)
+    workflow.add_node(node_name, node)
+    workflow.set_entry_point(node_name)
+    workflow.add_edge(node_name, END)
+    return workflow.compile()
+
+
+@cache
+def get_graph() -> Any:
+    """构建并返回SQL智能体图(首次调用时初始化, 之后复用同一实例)
+
+    LangGraph CLI 以零参数工厂函数的形式引用本函数(graph.py:get_graph)。
+    """
+    # 较重的 LangChain/LangGraph 依赖和模型初始化在真正需要图时才执行, 缩短模块导入时间
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    from workflow_sql.logging_config import setup_logging  # 日志配置
+    from workflow_sql.react_graph import create_sql_react_agent  # ReAct智能体
+
+    global _react_agent
+
+    # 初始化配置
+    config = get_config()
+
+    # 设置日志
+    setup_logging(config.logging)
+
+    # 设置API密钥到环境变量
+    if config.llm.api_key:
+        os.environ[f"{config.llm.provider.upper()}_API_KEY"] = config.llm.api_key
+
+    # 初始化语言模型
+    try:
+        llm = init_chat_model(f"{config.llm.provider}:{config.llm.model}")
+        if llm:
+            logger.info(f"语言模型初始化成功: {config.llm.provider}:{config.llm.model}")
+        else:
+            logger.warning("语言模型初始化失败，将使用错误处理图")
+    except Exception as e:
+        logger.error(f"语言模型初始化失败: {e}")
+        llm = None
+
+    # 创建ReAct智能体
+    try:
+        if llm is not None:
+            _react_agent = create_sql_react_agent(config, llm)
+            logger.info("SQL ReAct智能体创建成功")
+
+            # 创建标准的LangGraph图
+            def sql_react_node(state):
+                """SQL ReAct智能体节点，包含图表生成功能"""
+                return _react_agent.invoke(state)
+
+            async def asql_react_node(state):
+                """SQL ReAct智能体节点的异步版本(graph.ainvoke/astream 时使用, 不阻塞工作线程)"""
+                return await _react_agent.ainvoke(state)
+
+            # 构建标准图
+            return _build_message_graph("sql_react", RunnableLambda(sql_react_node, afunc=asql_react_node))
 
-# 创建ReAct智能体
-try:
-    if llm is not None:
-        _react_agent = create_sql_react_agent(config, llm)
-        logger.info("SQL ReAct智能体创建成功")
-
-        # 创建标准的LangGraph图
-        def sql_react_node(state: MessagesState) -> MessagesState:
-            """SQL ReAct智能体节点，包含图表生成功能"""
-            return _react_agent.invoke(state)
-
-        # 构建标准图
-        workflow = StateGraph(MessagesState)
-        workflow.add_node("sql_react", sql_react_node)
-        workflow.set_entry_point("sql_react")
-        workflow.add_edge("sql_react", END)
-        graph = workflow.compile()
-    else:
         logger.error("无法创建智能体：语言模型未初始化")
-        # 创建一个简单的错误图
-        from langgraph.graph import StateGraph, MessagesState, START, END
-        from langchain_core.messages import AIMessage
 
+        # 创建一个简单的错误图
         def error_node(state):
             response = AIMessage(content="SQL工作流暂时不可用，请检查模型配置")
             return {"messages": state.get("messages", []) + [response]}
 
-        workflow = StateGraph(MessagesState)
-        workflow.add_node("error", error_node)
-        workflow.set_entry_point("error")
-        workflow.add_edge("error", END)
-        graph = workflow.compile()
+        graph = _build_message_graph("error", error_node)
         logger.info("创建了错误处理图")
+        return graph
 
-except Exception as e:
-    logger.error(f"智能体创建失败: {e}")
-    # 最后的备用方案
-    from langgraph.graph import StateGraph, MessagesState, START, END
-    from langchain_core.messages import AIMessage
+    except Exception as e:
+        logger.error(f"智能体创建失败: {e}")
+        error_text = f"SQL工作流创建失败: {str(e)}"
+
+        # 最后的备用方案
+        def fallback_node(state):
+            response = AIMessage(content=error_text)
+            return {"messages": state.get("messages", []) + [response]}
 
-    def fallback_node(state):
-        response = AIMessage(content=f"SQL工作流创建失败: {str(e)}")
-        return {"messages": state.get("messages", []) + [response]}
+        graph = _build_message_graph("fallback", fallback_node)
+        logger.info("创建了备用图")
+        return graph
 
-    workflow = StateGraph(MessagesState)
-    workflow.add_node("fallback", fallback_node)
-    workflow.set_entry_point("fallback")
-    workflow.add_edge("fallback", END)
-    graph = workflow.compile()
-    logger.info("创建了备用图")
+
+def __getattr__(name: str) -> Any:
+    """延迟暴露 graph 和 config: 在代码中首次访问时才构建图/加载配置"""
+    if name == "graph":
+        return get_graph()
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # 导出图供LangGraph CLI使用
-__all__ = ["graph", "config"]
+__all__ = ["graph", "config", "get_graph"]
 
 
-def run_example() -> None:
+async def run_example() -> None:
     """运行示例查询来测试工作流"""
     question = "哪种音乐类型的曲目平均时长最长？"
 
     logger.info(f"运行示例查询: {question}")
 
     try:
-        # 如果有智能体实例，使用智能体的stream方法保留图表生成功能
-        if _react_agent is not None:
-            for step in _react_agent.stream(
-                {"messages": [{"role": "user", "content": question}]},
-                stream_mode="values",
-            ):
-                step["messages"][-1].pretty_print()
-        else:
-            # 否则使用标准图
-            for step in graph.stream(
-                {"messages": [{"role": "user", "content": question}]},
-                stream_mode="values",
-            ):
-                step["messages"][-1].pretty_print()
+        # updates 模式每步只返回节点产生的增量, 不再重复物化整个消息列表;
+        # subgraphs=True 同时输出 ReAct 智能体内部每一步的更新, 节点本身包含图表生成
+        async for _namespace, chunk in get_graph().astream(
+            {"messages": [{"role": "user", "content": question}]},
+            stream_mode="updates",
+            subgraphs=True,
+        ):
+            for update in chunk.values():
+                messages = (update or {}).get("messages")
+                if messages:
+                    messages[-1].pretty_print()
     except Exception as e:
         logger.error(f"运行示例时出错: {e}")
         raise
 
 
 if __name__ == "__main__":
-    run_example()
\ No newline at end of file
+    import asyncio
+
+    asyncio.run(run_example())
@@ -5,27 +5,22 @@
 """
 
 import logging
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
-from typing import Any
+from typing import Any, Dict, Tuple
 
 from langchain_core.language_models import BaseLanguageModel
-from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.graph import START, StateGraph
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.config import AgentConfig  # 智能体配置
-from workflow_sql.database import SQLDatabaseManager  # 数据库管理器
-from workflow_sql.nodes import AnswerGenerationNode, ChartGenerationNode, CheckQueryNode, GenerateQueryNode, GetSchemaNode, ListTablesNode, should_continue  # 图节点
-from workflow_sql.tools import SQLToolManager  # SQL工具管理器
+from .agent_types import SQLAgentState  # 工作流状态
+from .config import AgentConfig  # 智能体配置
+from .database import SQLDatabaseManager, get_database_manager  # 数据库管理器
+from .nodes import AnswerGenerationNode, ChartGenerationNode, CheckQueryNode, GenerateQueryNode, GetSchemaNode, ListTablesNode, should_continue  # 图节点
+from .tools import SQLToolManager  # SQL工具管理器
 
 logger = logging.getLogger(__name__)
 
+# (数据库URI, id(llm)) -> 编译后的图; 图通过节点持有 llm, 因此 id 不会被复用
+_graphs: Dict[Tuple[str, int], Any] = {}
+
 
 class SQLAgentGraphBuilder:
     """SQL智能体状态图构建器"""
@@ -49,7 +44,7 @@ class SQLAgentGraphBuilder:
         self.llm = llm
         self.db_manager = db_manager
         self.tool_manager = tool_manager
-        self.builder = StateGraph(MessagesState)
+        self.builder = StateGraph(SQLAgentState)
 
         # 初始化节点
         self.list_tables_node = ListTablesNode(tool_manager)
@@ -123,7 +118,7 @@ class SQLAgentGraphBuilder:
 
 
 def create_sql_agent_graph(config: AgentConfig, llm: BaseLanguageModel) -> Any:
-    """使用给定配置创建SQL智能体图
+    """使用给定配置创建SQL智能体图, 相同数据库和语言模型复用已编译的图
 
     Args:
         config: 智能体配置
@@ -132,15 +127,22 @@ def create_sql_agent_graph(config: AgentConfig, llm: BaseLanguageModel) -> Any:
     Returns:
         编译后的LangGraph状态图
     """
+    key = (config.database.uri, id(llm))
+    graph = _graphs.get(key)
+    if graph is not None:
+        logger.debug("复用已编译的SQL智能体图")
+        return graph
+
     logger.info("创建SQL智能体图")
 
     # 创建管理器
-    db_manager = SQLDatabaseManager(config.database)
+    db_manager = get_database_manager(config.database)
+    db_manager.warm_up()  # 预先建立连接, 首个请求无需等待连接和表名查询
     tool_manager = SQLToolManager(db_manager, llm)
 
     # 创建并构建图
     builder = SQLAgentGraphBuilder(config, llm, db_manager, tool_manager)
-    graph = builder.build_graph()
+    graph = _graphs[key] = builder.build_graph()
 
     logger.info("SQL智能体图创建成功")
     return graph
@@ -6,16 +6,10 @@
 
 import logging
 import os
-# 修复相对导入问题，使用绝对导入
 import sys
+from typing import Dict
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.config import LoggingConfig  # 日志配置类
+from .config import LoggingConfig  # 日志配置类
 
 
 class ColoredFormatter(logging.Formatter):
@@ -30,14 +24,14 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '\033[35m',   # 紫色
     }
 
-    # 节点特定颜色
+    # 模块特定颜色(按日志记录器名称前缀匹配, 子记录器继承上级颜色)
     NODE_COLORS = {
-        'nodes': '\033[94m',           # 蓝色 - 节点执行
-        'graph_builder': '\033[96m',   # 亮青色 - 图构建
-        'database': '\033[92m',        # 亮绿色 - 数据库
-        'tools': '\033[93m',           # 亮黄色 - 工具
-        'mcp_client': '\033[95m',      # 亮紫色 - MCP客户端
-        'async_chart_generator': '\033[91m',  # 亮红色 - 图表生成
+        'workflow_sql.nodes': '\033[94m',           # 蓝色 - 节点执行
+        'workflow_sql.graph_builder': '\033[96m',   # 亮青色 - 图构建
+        'workflow_sql.database': '\033[92m',        # 亮绿色 - 数据库
+        'workflow_sql.tools': '\033[93m',           # 亮黄色 - 工具
+        'workflow_sql.mcp_client': '\033[95m',      # 亮紫色 - MCP客户端
+        'workflow_sql.async_chart_generator': '\033[91m',  # 亮红色 - 图表生成
     }
 
     RESET = '\033[0m'  # 重置颜色
@@ -50,26 +44,30 @@ class ColoredFormatter(logging.Formatter):
             os.getenv('NO_COLOR') is None and
             os.getenv('TERM') != 'dumb'
         )
-
-    def format(self, record):
         if not self.use_colors:
-            return super().format(record)
+            # 不支持颜色时直接使用基础格式化, 每条日志不再做任何颜色判断
+            self.format = super().format
+        # 日志记录器名称 -> 模块特定颜色, 每个记录器只扫描一次 NODE_COLORS
+        self._module_colors: Dict[str, str] = {}
+
+    def _get_module_color(self, name: str) -> str:
+        """根据日志记录器名称获取模块特定颜色(结果按名称缓存)"""
+        color = self._module_colors.get(name)
+        if color is None:
+            # 从完整名称逐级向上查找, 命中最长的已配置前缀
+            prefix = name
+            while prefix and prefix not in self.NODE_COLORS:
+                prefix = prefix.rpartition('.')[0]
+            color = self.NODE_COLORS.get(prefix, '')
+            self._module_colors[name] = color
+        return color
 
+    def format(self, record):
         # 获取基础格式化结果
         log_message = super().format(record)
 
-        # 根据日志级别选择颜色
-        level_color = self.COLORS.get(record.levelname, '')
-
-        # 根据模块名选择特定颜色
-        module_color = ''
-        for module, color in self.NODE_COLORS.items():
-            if module in record.name:
-                module_color = color
-                break
-
-        # 如果有模块特定颜色，优先使用
-        color = module_color or level_color
+        # 如果有模块特定颜色，优先使用；否则根据日志级别选择颜色
+        color = self._get_module_color(record.name) or self.COLORS.get(record.levelname, '')
 
         if color:
             return f"{color}{log_message}{self.RESET}"
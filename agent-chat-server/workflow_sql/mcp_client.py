@@ -4,36 +4,34 @@
 本模块提供MCP (Model Context Protocol) 客户端的管理功能。
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
 from langchain_core.tools import BaseTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
-try:
-    # 当作为模块导入时使用相对导入
-    from .mcp_config import MCPServerConfig, mcp_config
-    from .agent_types import ToolNotFoundError
-except ImportError:
-    # 当直接运行时使用绝对导入
-    from mcp_config import MCPServerConfig, mcp_config
-    from agent_types import ToolNotFoundError
+from .mcp_config import MCPServerConfig, mcp_config  # MCP配置
+from .agent_types import ToolNotFoundError  # 工具异常类型
 
 logger = logging.getLogger(__name__)
 
+_CLOSE_TIMEOUT = 5.0  # 关闭客户端的超时时间(秒)
+
 
 class MCPClientManager:
     """MCP客户端管理器"""
     
     def __init__(self):
         """初始化MCP客户端管理器"""
-        self._clients: Dict[str, MultiServerMCPClient] = {}
-        self._tools_cache: Dict[str, List[BaseTool]] = {}
-        self._cache_timestamps: Dict[str, float] = {}
+        self._client: Optional[MultiServerMCPClient] = None  # 包含所有已配置服务器的单一客户端
+        self._tools_cache: Dict[str, Tuple[float, List[BaseTool]]] = {}  # 服务器名 -> (获取时间, 工具列表)
+        self._tools_locks: Dict[str, asyncio.Lock] = {}  # 每个服务器一把锁, 并发请求只获取一次工具
         self._cache_timeout = 300  # 缓存5分钟
     
     async def get_client(self, server_name: str) -> MultiServerMCPClient:
-        """获取或创建MCP客户端
+        """获取MCP客户端, 首次调用时用所有已配置的服务器创建一个共享客户端
         
         Args:
             server_name: 服务器名称
@@ -44,16 +42,17 @@ class MCPClientManager:
         Raises:
             ToolNotFoundError: 如果服务器配置不存在
         """
-        if server_name not in self._clients:
-            server_config = mcp_config.get_server_config(server_name)
-            if not server_config:
-                raise ToolNotFoundError(f"未找到MCP服务器配置: {server_name}")
-            
-            client_config = self._build_client_config(server_config)
-            self._clients[server_name] = MultiServerMCPClient(client_config)
-            logger.info(f"创建MCP客户端: {server_name}")
+        if mcp_config.get_server_config(server_name) is None:
+            raise ToolNotFoundError(f"未找到MCP服务器配置: {server_name}")
         
-        return self._clients[server_name]
+        if self._client is None:
+            client_config: Dict[str, Dict[str, Any]] = {}
+            for server_config in mcp_config.servers.values():
+                client_config.update(self._build_client_config(server_config))
+            self._client = MultiServerMCPClient(client_config)
+            logger.info(f"创建MCP客户端: {', '.join(client_config)}")
+        
+        return self._client
     
     def _build_client_config(self, server_config: MCPServerConfig) -> Dict[str, Dict[str, Any]]:
         """构建客户端配置
@@ -75,10 +74,10 @@ class MCPClientManager:
             config_dict["command"] = server_config.command
         
         if server_config.args:
-            config_dict["args"] = server_config.args
+            config_dict["args"] = list(server_config.args)
         
         if server_config.env:
-            config_dict["env"] = server_config.env
+            config_dict["env"] = dict(server_config.env)
         
         return {server_config.name: config_dict}
     
@@ -91,26 +90,78 @@ class MCPClientManager:
         Returns:
             工具列表
         """
-        import time
-        current_time = time.time()
-
-        # 检查缓存是否有效
-        if (server_name in self._tools_cache and
-            server_name in self._cache_timestamps and
-            current_time - self._cache_timestamps[server_name] < self._cache_timeout):
+        tools = self._get_cached_tools(server_name)
+        if tools is not None:
             logger.info(f"使用缓存的工具: {server_name}")
-            return self._tools_cache[server_name]
+            return tools
+
+        lock = self._tools_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            # 等锁期间其他协程可能已经获取并缓存了工具
+            tools = self._get_cached_tools(server_name)
+            if tools is not None:
+                return tools
+
+            # 获取新的工具
+            client = await self.get_client(server_name)
+            tools = await client.get_tools(server_name=server_name)
+
+            # 更新缓存
+            self._tools_cache[server_name] = (time.monotonic(), tools)
+            logger.info(f"获取到 {len(tools)} 个工具: {server_name}")
 
-        # 获取新的工具
-        client = await self.get_client(server_name)
-        tools = await client.get_tools()
+        return tools
 
-        # 更新缓存
-        self._tools_cache[server_name] = tools
-        self._cache_timestamps[server_name] = current_time
-        logger.info(f"获取到 {len(tools)} 个工具: {server_name}")
+    def _get_cached_tools(self, server_name: str) -> Optional[List[BaseTool]]:
+        """获取未过期的缓存工具列表, 过期条目会被移除
+
+        Args:
+            server_name: 服务器名称
+
+        Returns:
+            缓存的工具列表，不存在或已过期时返回None
+        """
+        entry = self._tools_cache.get(server_name)
+        if entry is None:
+            return None
 
-        return self._tools_cache[server_name]
+        timestamp, tools = entry
+        if time.monotonic() - timestamp >= self._cache_timeout:
+            self._tools_cache.pop(server_name, None)
+            return None
+        return tools
+    
+    async def get_tools_many(self, server_names: List[str]) -> Dict[str, List[BaseTool]]:
+        """并发获取多个服务器的工具列表
+        
+        Args:
+            server_names: 服务器名称列表
+            
+        Returns:
+            服务器名 -> 工具列表，获取失败的服务器不包含在结果中
+        """
+        results = await asyncio.gather(
+            *(self.get_tools(name) for name in server_names),
+            return_exceptions=True,
+        )
+        
+        tools_by_server: Dict[str, List[BaseTool]] = {}
+        for name, result in zip(server_names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"获取MCP工具失败 {name}: {result}")
+            else:
+                tools_by_server[name] = result
+        return tools_by_server
+    
+    async def preload(self, server_names: Optional[List[str]] = None) -> None:
+        """预热工具缓存, 使首个请求无需等待MCP服务器启动
+        
+        Args:
+            server_names: 要预热的服务器名称列表，为None时预热所有已配置的服务器
+        """
+        names = list(mcp_config.servers) if server_names is None else server_names
+        tools_by_server = await self.get_tools_many(names)
+        logger.info(f"MCP工具预热完成: {len(tools_by_server)}/{len(names)} 个服务器")
     
     async def get_chart_tools(self) -> List[BaseTool]:
         """获取图表生成工具
@@ -126,18 +177,19 @@ class MCPClientManager:
         logger.info("MCP工具缓存已清除")
     
     async def close_all(self) -> None:
-        """关闭所有客户端连接"""
-        for server_name, client in self._clients.items():
-            try:
-                # 如果客户端有close方法，调用它
-                if hasattr(client, 'close'):
-                    await client.close()
-                logger.info(f"关闭MCP客户端: {server_name}")
-            except Exception as e:
-                logger.error(f"关闭MCP客户端失败 {server_name}: {e}")
-        
-        self._clients.clear()
+        """关闭客户端连接(超时或失败时只记录日志)"""
+        client, self._client = self._client, None
         self._tools_cache.clear()
+        if client is None:
+            return
+        
+        try:
+            # 如果客户端有close方法，调用它
+            if hasattr(client, 'close'):
+                await asyncio.wait_for(client.close(), timeout=_CLOSE_TIMEOUT)
+            logger.info("关闭MCP客户端")
+        except Exception as e:
+            logger.error(f"关闭MCP客户端失败: {e}")
 
 
 # 全局MCP客户端管理器实例
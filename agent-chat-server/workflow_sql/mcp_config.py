@@ -6,7 +6,8 @@
 
 import os
 from dataclasses import dataclass
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 from dotenv import load_dotenv
 
@@ -14,19 +15,19 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MCPServerConfig:
-    """MCP服务器配置类"""
+    """MCP服务器配置类(加载后只读)"""
     
     name: str                                    # 服务器名称
     transport: str                               # 传输方式 (sse/stdio)
     url: Optional[str] = None                    # SSE连接URL
     command: Optional[str] = None                # stdio命令
-    args: Optional[list] = None                  # 命令参数
-    env: Optional[Dict[str, str]] = None         # 环境变量
+    args: Tuple[str, ...] = ()                   # 命令参数
+    env: Tuple[Tuple[str, str], ...] = ()        # 环境变量(键值对元组, 保证配置可哈希)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ChartConfig:
     """图表生成配置类"""
     
@@ -35,6 +36,22 @@ class ChartConfig:
     max_data_points: int = 20                    # 最大数据点数
     chart_width: int = 800                       # 图表宽度
     chart_height: int = 600                      # 图表高度
+    max_concurrency: int = 4                     # 同时进行的图表生成数上限
+    timeout_seconds: float = 60.0                # 单次图表生成超时时间（秒）
+
+
+@lru_cache(maxsize=1)
+def _load_chart_config_from_env() -> ChartConfig:
+    """从环境变量解析图表配置(进程内只解析一次, 结果不可变)"""
+    return ChartConfig(
+        enabled=os.getenv("CHART_ENABLED", "true").lower() == "true",
+        default_chart_type=os.getenv("DEFAULT_CHART_TYPE", "bar"),
+        max_data_points=int(os.getenv("MAX_DATA_POINTS", "20")),
+        chart_width=int(os.getenv("CHART_WIDTH", "800")),
+        chart_height=int(os.getenv("CHART_HEIGHT", "600")),
+        max_concurrency=int(os.getenv("CHART_MAX_CONCURRENCY", "4")),
+        timeout_seconds=float(os.getenv("CHART_TIMEOUT_SECONDS", "60"))
+    )
 
 
 class MCPConfig:
@@ -52,19 +69,13 @@ class MCPConfig:
                 name="mcp-server-chart",
                 transport="stdio",
                 command="npx",
-                args=["-y", "@antv/mcp-server-chart"]
+                args=("-y", "@antv/mcp-server-chart")
             )
         }
     
     def _load_chart_config(self) -> ChartConfig:
         """加载图表配置"""
-        return ChartConfig(
-            enabled=os.getenv("CHART_ENABLED", "true").lower() == "true",
-            default_chart_type=os.getenv("DEFAULT_CHART_TYPE", "bar"),
-            max_data_points=int(os.getenv("MAX_DATA_POINTS", "20")),
-            chart_width=int(os.getenv("CHART_WIDTH", "800")),
-            chart_height=int(os.getenv("CHART_HEIGHT", "600"))
-        )
+        return _load_chart_config_from_env()
     
     def get_server_config(self, server_name: str) -> Optional[MCPServerConfig]:
         """获取指定服务器配置
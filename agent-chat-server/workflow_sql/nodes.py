@@ -4,28 +4,20 @@
 本模块包含SQL智能体工作流中使用的所有图节点的实现。
 """
 
+import ast
 import logging
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
-from typing import Dict, List
+import re
+from typing import Any, Dict, List
 
 from langchain_core.language_models import BaseLanguageModel
-from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langgraph.graph import END, MessagesState
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.database import SQLDatabaseManager  # 数据库管理器
-from workflow_sql.tools import SQLToolManager  # SQL工具管理器
-from workflow_sql.agent_types import BaseNode  # 基础节点类
-from workflow_sql.mcp_config import mcp_config  # MCP配置
-from workflow_sql.async_chart_generator import run_async_chart_generation  # 异步图表生成
-from workflow_sql.logging_config import get_node_logger, log_node_start, log_node_complete, log_node_error  # 日志工具
+from .database import SQLDatabaseManager  # 数据库管理器
+from .tools import SQLToolManager  # SQL工具管理器
+from .agent_types import BaseNode, SQLAgentState, message_text  # 基础节点类、工作流状态和消息文本提取
+from .mcp_config import mcp_config  # MCP配置
+from .logging_config import get_node_logger, log_node_start, log_node_complete, log_node_error  # 日志工具
 
 
 # 创建不同颜色的日志记录器
@@ -37,6 +29,25 @@ query_check_logger = get_node_logger("QueryCheck")
 answer_gen_logger = get_node_logger("AnswerGeneration")
 chart_gen_logger = get_node_logger("ChartGeneration")
 
+# ListTablesNode 每次发出的工具调用完全相同, 定义一次后复用
+_LIST_TABLES_TOOL_CALL = {
+    "name": "sql_db_list_tables",
+    "args": {},
+    "id": "list_tables_call",
+    "type": "tool_call",
+}
+
+# 表名列表以逗号或换行分隔
+_TABLE_SEPARATOR_PATTERN = re.compile(r'[,\n]+')
+
+# 无需调用 LLM 即可回答的查询结果: 空结果(空字符串/[]/None)和执行错误(SQL 工具以 "Error" 开头返回)
+_EMPTY_RESULT_PATTERN = re.compile(r'\s*(?:\[\]|None)?\s*')
+_ERROR_RESULT_PATTERN = re.compile(r'\s*(?:Error|错误)', re.IGNORECASE)
+
+# 每轮开始时清空的结构化状态: 有检查点时这些字段会跨轮保留, 本轮出错的节点不会覆盖它们,
+# 若不清空, 下游节点会基于上一轮的查询结果作答和绘图
+_TURN_STATE_RESET = {"table_names": [], "last_query": "", "last_result": "", "answer": ""}
+
 
 class ListTablesNode(BaseNode):
     """列出可用数据库表的节点"""
@@ -50,7 +61,7 @@ class ListTablesNode(BaseNode):
         super().__init__("list_tables")
         self.tool_manager = tool_manager
 
-    def execute(self, state: MessagesState) -> Dict[str, List[BaseMessage]]:
+    def execute(self, state: SQLAgentState) -> Dict[str, Any]:
         """执行列表表操作
 
         Args:
@@ -62,30 +73,34 @@ class ListTablesNode(BaseNode):
         try:
             log_node_start(list_tables_logger, "ListTables", "获取数据库表列表")
 
-            # 创建预定义的工具调用
-            tool_call = {
-                "name": "sql_db_list_tables",
-                "args": {},
-                "id": "list_tables_call",
-                "type": "tool_call",
-            }
-            tool_call_message = AIMessage(content="", tool_calls=[tool_call])
+            # 工具调用使用模块级常量; 消息对象仍每次新建, 因为 add_messages 会就地为消息分配 id
+            tool_call_message = AIMessage(content="", tool_calls=[_LIST_TABLES_TOOL_CALL])
 
             # 获取工具并执行
             list_tables_tool = self.tool_manager.get_list_tables_tool()
-            tool_message = list_tables_tool.invoke(tool_call)
+            tool_message = list_tables_tool.invoke(_LIST_TABLES_TOOL_CALL)
 
             # 创建响应消息
             response = AIMessage(f"可用表: {tool_message.content}")
 
-            table_count = len(tool_message.content.split(', ')) if tool_message.content else 0
-            log_node_complete(list_tables_logger, "ListTables", f"发现 {table_count} 个表")
-            return {"messages": [tool_call_message, tool_message, response]}
+            # 解析一次表名写入状态, GetSchemaNode 直接读取
+            table_names = _parse_table_names(message_text(tool_message))
+            log_node_complete(list_tables_logger, "ListTables", f"发现 {len(table_names)} 个表")
+            return {
+                **_TURN_STATE_RESET,
+                "messages": [tool_call_message, tool_message, response],
+                "table_names": table_names,
+                "user_question": _latest_user_question(state["messages"]),
+            }
 
         except Exception as e:
             log_node_error(list_tables_logger, "ListTables", str(e))
             error_message = AIMessage(f"获取表列表失败: {str(e)}")  # 优化错误消息
-            return {"messages": [error_message]}
+            return {
+                **_TURN_STATE_RESET,
+                "messages": [error_message],
+                "user_question": _latest_user_question(state.get("messages", [])),
+            }
 
 
 class GetSchemaNode(BaseNode):
@@ -102,7 +117,7 @@ class GetSchemaNode(BaseNode):
         self.tool_manager = tool_manager
         self.llm = llm
 
-    def execute(self, state: MessagesState) -> Dict[str, List[BaseMessage]]:
+    def execute(self, state: SQLAgentState) -> Dict[str, List[BaseMessage]]:
         """执行结构检索操作
 
         Args:
@@ -114,23 +129,13 @@ class GetSchemaNode(BaseNode):
         try:
             log_node_start(schema_logger, "GetSchema", "获取数据库表结构信息")
 
-            # 从前面的消息中查找表名信息
-            table_names = []
-            for message in state["messages"]:
-                if hasattr(message, 'content') and "可用表:" in message.content:
-                    # 从ListTablesNode的响应中提取表名
-                    # 查找对应的工具消息
-                    for i, msg in enumerate(state["messages"]):
-                        if (hasattr(msg, 'tool_call_id') and
-                            hasattr(msg, 'content') and
-                            msg.content):
-                            # 解析表名列表
-                            content = msg.content.strip()
-                            if content:
-                                # 假设表名以逗号分隔或换行分隔
-                                table_names = [name.strip() for name in content.replace('\n', ',').split(',') if name.strip()]
-                                break
-                    break
+            # 优先使用 ListTablesNode 写入状态的表名; 否则从最近一次列表表工具结果中解析
+            table_names = state.get("table_names") or []
+            if not table_names:
+                for msg in reversed(state["messages"]):
+                    if getattr(msg, 'tool_call_id', None) == "list_tables_call":
+                        table_names = _parse_table_names(message_text(msg))
+                        break
 
             # 如果没有从消息中找到表名，直接从数据库获取
             if not table_names:
@@ -156,7 +161,7 @@ class GetSchemaNode(BaseNode):
             tool_message = schema_tool.invoke(tool_call)
 
             # 创建响应消息
-            response = AIMessage(f"数据库结构信息已获取")
+            response = AIMessage("数据库结构信息已获取")
 
             log_node_complete(schema_logger, "GetSchema", "数据库结构信息获取成功")
             return {"messages": [tool_call_message, tool_message, response]}
@@ -187,9 +192,11 @@ class GenerateQueryNode(BaseNode):
         self.tool_manager = tool_manager
         self.llm = llm
         self.db_manager = db_manager
+        # 系统消息在节点生命周期内不变, 构建一次后在每次调用中复用(LLM 不会修改输入消息)
+        self._system_message = {"role": "system", "content": self._build_system_prompt()}
 
-    def _get_system_prompt(self) -> str:
-        """获取查询生成的系统提示"""
+    def _build_system_prompt(self) -> str:
+        """构建查询生成的系统提示"""
         dialect = self.db_manager.get_dialect()
         max_results = self.db_manager.config.max_query_results
 
@@ -217,15 +224,10 @@ class GenerateQueryNode(BaseNode):
         try:
             log_node_start(query_gen_logger, "QueryGeneration", "基于用户问题生成SQL查询")
 
-            system_message = {
-                "role": "system",
-                "content": self._get_system_prompt(),
-            }
-
             # 绑定查询工具但不强制使用
             query_tool = self.tool_manager.get_query_tool()
             llm_with_tools = self.llm.bind_tools([query_tool])
-            response = llm_with_tools.invoke([system_message] + state["messages"])
+            response = llm_with_tools.invoke([self._system_message] + state["messages"])
 
             log_node_complete(query_gen_logger, "QueryGeneration", "SQL查询生成成功")
             return {"messages": [response]}
@@ -256,9 +258,11 @@ class CheckQueryNode(BaseNode):
         self.tool_manager = tool_manager
         self.llm = llm
         self.db_manager = db_manager
+        # 系统提示在节点生命周期内不变, 构建一次后复用
+        self._system_prompt = self._build_system_prompt()
 
-    def _get_system_prompt(self) -> str:
-        """获取查询验证的系统提示"""
+    def _build_system_prompt(self) -> str:
+        """构建查询验证的系统提示"""
         dialect = self.db_manager.get_dialect()
 
         return f"""
@@ -278,7 +282,7 @@ class CheckQueryNode(BaseNode):
 完成检查后，您将调用相应的工具来执行查询。
         """.strip()
 
-    def execute(self, state: MessagesState) -> Dict[str, List[BaseMessage]]:
+    def execute(self, state: SQLAgentState) -> Dict[str, Any]:
         """执行查询验证操作
 
         Args:
@@ -291,13 +295,13 @@ class CheckQueryNode(BaseNode):
             log_node_start(query_check_logger, "QueryCheck", "验证并执行SQL查询")
 
             # 从最后一条消息的工具调用中获取查询
-            last_message = state["messages"][-1]
-            if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
+            tool_calls = getattr(state["messages"][-1], 'tool_calls', None)
+            if not tool_calls:
                 logger.error("最后一条消息中未找到工具调用")
                 error_message = AIMessage("错误: 未找到要验证的查询")
                 return {"messages": [error_message]}
 
-            tool_call = last_message.tool_calls[0]
+            tool_call = tool_calls[0]
 
             # 更安全的参数获取方式
             if "args" not in tool_call or "query" not in tool_call["args"]:
@@ -308,13 +312,6 @@ class CheckQueryNode(BaseNode):
             query = tool_call["args"]["query"]
             logger.info(f"获取到查询: {query}")
 
-            system_message = {
-                "role": "system",
-                "content": self._get_system_prompt(),
-            }
-
-            user_message = {"role": "user", "content": query}
-
             # 创建预定义的工具调用来执行查询
             validated_tool_call = {
                 "name": "sql_db_query",
@@ -332,7 +329,11 @@ class CheckQueryNode(BaseNode):
             response = AIMessage(f"查询执行完成: {tool_message.content}")
 
             log_node_complete(query_check_logger, "QueryCheck", "SQL查询执行成功")
-            return {"messages": [validated_tool_call_message, tool_message, response]}
+            return {
+                "messages": [validated_tool_call_message, tool_message, response],
+                "last_query": query,
+                "last_result": str(tool_message.content).strip(),
+            }
 
         except Exception as e:
             logger.error(f"检查查询节点错误: {e}")
@@ -351,9 +352,11 @@ class AnswerGenerationNode(BaseNode):
         """
         super().__init__("answer_generation")
         self.llm = llm
+        # 系统消息在节点生命周期内不变, 构建一次后在每次调用中复用(LLM 不会修改输入消息)
+        self._system_message = {"role": "system", "content": self._build_system_prompt()}
 
-    def _get_system_prompt(self) -> str:
-        """获取答案生成的系统提示"""
+    def _build_system_prompt(self) -> str:
+        """构建答案生成的系统提示"""
         return """
 您是一个专业的数据分析助手，负责解释SQL查询结果并生成用户友好的答案。
 
@@ -371,41 +374,13 @@ class AnswerGenerationNode(BaseNode):
 - 保持回答简洁但完整
         """.strip()
 
-    def _extract_user_question(self, messages: List[BaseMessage]) -> str:
-        """从消息历史中提取用户的原始问题"""
-        for message in messages:
-            if hasattr(message, 'content') and message.content:
-                # 确保content是字符串类型
-                content = str(message.content) if not isinstance(message.content, str) else message.content
-                # 查找第一个人类消息
-                if not content.startswith("可用表:") and not content.startswith("数据库结构"):
-                    return content
-        return "用户问题"
-
-    def _extract_query_and_result(self, messages: List[BaseMessage]) -> tuple[str, str]:
-        """从消息历史中提取SQL查询和结果"""
-        query = ""
-        result = ""
-
-        for message in messages:
-            # 查找查询执行完成的消息
-            if hasattr(message, 'content') and "查询执行完成:" in message.content:
-                result = message.content.replace("查询执行完成:", "").strip()
-
-                # 在前面的消息中查找对应的查询
-                for prev_msg in reversed(messages):
-                    if hasattr(prev_msg, 'tool_calls') and prev_msg.tool_calls:
-                        for tool_call in prev_msg.tool_calls:
-                            if tool_call.get("name") == "sql_db_query":
-                                query = tool_call.get("args", {}).get("query", "")
-                                break
-                        if query:
-                            break
-                break
-
-        return query, result
+    def _direct_answer(self, content: str) -> Dict[str, Any]:
+        """不经过LLM直接返回答案(用于空结果和查询错误)"""
+        log_node_complete(answer_gen_logger, "AnswerGeneration", "查询结果为空或出错，跳过LLM调用")
+        final_answer = AIMessage(content=content)
+        return {"messages": [final_answer], "answer": content}
 
-    def execute(self, state: MessagesState) -> Dict[str, List[BaseMessage]]:
+    def execute(self, state: SQLAgentState) -> Dict[str, Any]:
         """执行答案生成操作
 
         Args:
@@ -417,20 +392,24 @@ class AnswerGenerationNode(BaseNode):
         try:
             log_node_start(answer_gen_logger, "AnswerGeneration", "生成用户友好的自然语言答案")
 
-            # 提取用户问题、查询和结果
-            user_question = self._extract_user_question(state["messages"])
-            query, result = self._extract_query_and_result(state["messages"])
+            # 读取上游节点写入状态的用户问题、查询和结果
+            user_question = state.get("user_question") or "用户问题"
+            query = state.get("last_query", "")
+            result = state.get("last_result", "")
 
-            logger.info(f"用户问题: {user_question}")
-            logger.info(f"执行的查询: {query}")
-            logger.info(f"查询结果: {result}")
+            # 查询结果可能很长, 关闭 INFO 时跳过格式化
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"用户问题: {user_question}")
+                logger.info(f"执行的查询: {query}")
+                logger.info(f"查询结果: {result}")
 
-            # 构建提示消息
-            system_message = {
-                "role": "system",
-                "content": self._get_system_prompt(),
-            }
+            # 结果为空或查询出错时直接给出答案, 省去一次 LLM 调用
+            if _EMPTY_RESULT_PATTERN.fullmatch(result):
+                return self._direct_answer("查询没有返回任何数据。")
+            if _ERROR_RESULT_PATTERN.match(result):
+                return self._direct_answer(f"未能获取查询结果：{result}")
 
+            # 构建提示消息
             user_message = {
                 "role": "user",
                 "content": f"""
@@ -447,13 +426,13 @@ class AnswerGenerationNode(BaseNode):
             }
 
             # 调用LLM生成答案
-            response = self.llm.invoke([system_message, user_message])
+            response = self.llm.invoke([self._system_message, user_message])
 
             # 创建最终答案消息
             final_answer = AIMessage(content=response.content)
 
             log_node_complete(answer_gen_logger, "AnswerGeneration", "自然语言答案生成成功")
-            return {"messages": [final_answer]}
+            return {"messages": [final_answer], "answer": final_answer.content}
 
         except Exception as e:
             logger.error(f"答案生成节点错误: {e}")
@@ -472,9 +451,13 @@ class ChartGenerationNode(BaseNode):
         """
         super().__init__("chart_generation")
         self.llm = llm
+        # 图表配置在进程内只从环境变量加载一次, 开关可在构造时读取
+        self._chart_enabled = mcp_config.chart.enabled
+        # 系统提示在节点生命周期内不变, 构建一次后复用
+        self._system_prompt = self._build_system_prompt()
 
-    def _get_system_prompt(self) -> str:
-        """获取图表生成的系统提示"""
+    def _build_system_prompt(self) -> str:
+        """构建图表生成的系统提示"""
         return """
 您是一个专业的数据可视化专家，负责根据SQL查询结果生成合适的图表。
 
@@ -497,57 +480,16 @@ class ChartGenerationNode(BaseNode):
 - 使用合适的颜色和样式
         """.strip()
 
-    def _extract_chart_data(self, messages: List[BaseMessage]) -> tuple[str, str, str]:
-        """从消息历史中提取图表数据
-
-        Returns:
-            (用户问题, 查询结果, 答案内容)
-        """
-        user_question = ""
-        query_result = ""
-        answer_content = ""
-
-        for message in messages:
-            if hasattr(message, 'content') and message.content:
-                # 确保content是字符串类型
-                content = str(message.content) if not isinstance(message.content, str) else message.content
-
-                # 提取用户问题（第一个非系统消息）
-                if not user_question and not content.startswith(("可用表:", "数据库结构", "查询执行完成")):
-                    user_question = content
-
-                # 提取查询结果
-                if "查询执行完成:" in content:
-                    query_result = content.replace("查询执行完成:", "").strip()
-
-                # 提取最终答案（最后一个AI消息，不包含系统信息）
-                if (not content.startswith(("可用表:", "数据库结构", "查询执行完成", "Tool Calls:")) and
-                    "错误" not in content and len(content) > 20):
-                    answer_content = content
-
-        return user_question, query_result, answer_content
-
     def _determine_chart_type(self, query_result: str, user_question: str) -> str:
         """根据数据和问题确定图表类型"""
-        question_lower = user_question.lower()
-
-        # 根据问题关键词判断
-        if any(word in question_lower for word in ["趋势", "变化", "时间", "增长"]):
-            return "line"
-        elif any(word in question_lower for word in ["比例", "占比", "份额"]):
-            return "pie"
-        elif any(word in question_lower for word in ["比较", "排名", "最", "前", "后"]):
-            return "bar"
-        else:
-            # 默认使用柱状图
-            return "bar"
+        from .async_chart_generator import determine_chart_type
+        return determine_chart_type(user_question)
 
     def _generate_chart_description(self, user_question: str, query_result: str,
                                    answer_content: str, chart_type: str) -> str:
         """生成图表描述"""
         try:
-            # 解析查询结果
-            import ast
+            # 解析查询结果(SQLDatabase.run 返回 Python 字面量格式的元组列表)
             data = ast.literal_eval(query_result)
 
             if not data:
@@ -567,7 +509,7 @@ class ChartGenerationNode(BaseNode):
             logger.error(f"生成图表描述时出错: {e}")
             return f"建议生成{chart_type}图表来可视化查询结果。"
 
-    def execute(self, state: MessagesState) -> Dict[str, List[BaseMessage]]:
+    def execute(self, state: SQLAgentState) -> Dict[str, List[BaseMessage]]:
         """执行图表生成操作
 
         Args:
@@ -576,26 +518,30 @@ class ChartGenerationNode(BaseNode):
         Returns:
             包含图表信息的更新状态
         """
+        # 图表功能未启用时直接返回, 不进入节点日志和状态读取
+        if not self._chart_enabled:
+            logger.info("图表生成功能已禁用")
+            return {"messages": [AIMessage("图表生成功能当前不可用")]}
+
         try:
             log_node_start(chart_gen_logger, "ChartGeneration", "生成数据可视化图表")
 
-            # 检查图表功能是否启用
-            if not mcp_config.chart.enabled:
-                logger.info("图表生成功能已禁用")
-                return {"messages": [AIMessage("图表生成功能当前不可用")]}
-
-            # 提取数据
-            user_question, query_result, answer_content = self._extract_chart_data(state["messages"])
+            # 读取上游节点写入状态的数据
+            user_question = state.get("user_question", "")
+            query_result = state.get("last_result", "")
+            answer_content = state.get("answer", "")
 
             if not query_result:
                 logger.warning("未找到查询结果，跳过图表生成")
                 return {"messages": [AIMessage("无法生成图表：未找到查询结果")]}
 
-            logger.info(f"用户问题: {user_question}")
-            logger.info(f"查询结果: {query_result}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"用户问题: {user_question}")
+                logger.info(f"查询结果: {query_result}")
 
-            # 尝试使用异步图表生成
+            # 尝试使用异步图表生成(图表模块在首次生成图表时才导入, 图表功能关闭时不加载)
             try:
+                from .async_chart_generator import run_async_chart_generation
                 chart_result = run_async_chart_generation(
                     self.llm, user_question, query_result, answer_content
                 )
@@ -623,6 +569,19 @@ class ChartGenerationNode(BaseNode):
             return {"messages": [error_message]}
 
 
+def _parse_table_names(content: str) -> List[str]:
+    """解析列表表工具返回的表名(一次正则切分, 去除空白和空项)"""
+    return [name for name in map(str.strip, _TABLE_SEPARATOR_PATTERN.split(content)) if name]
+
+
+def _latest_user_question(messages: List[BaseMessage]) -> str:
+    """获取最近一条用户消息的内容(从后向前查找, 命中即停止)"""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) and message.content:
+            return message_text(message)
+    return ""
+
+
 def should_continue(state: MessagesState):
     """确定是否继续查询验证或结束
 
@@ -632,23 +591,20 @@ def should_continue(state: MessagesState):
     Returns:
         下一个节点名称或END
     """
-    try:
-        messages = state["messages"]
-        last_message = messages[-1]
-
-        # 检查最后一条消息是否有sql_db_query工具调用
-        if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-            tool_call = last_message.tool_calls[0]
-            if tool_call.get("name") == "sql_db_query":
-                logger.debug("找到sql_db_query工具调用，继续到check_query")
-                return "check_query"
-            else:
-                logger.debug(f"找到其他工具调用: {tool_call.get('name')}，结束对话")
-                return END
-        else:
-            logger.debug("未找到工具调用，结束对话")
-            return END
-
-    except Exception as e:
-        logger.error(f"should_continue错误: {e}")
+    messages = state["messages"]
+    if not messages:
+        return END
+
+    # 检查最后一条消息是否有sql_db_query工具调用(getattr 一次查找代替 hasattr + 属性访问)
+    tool_calls = getattr(messages[-1], 'tool_calls', None)
+    if not tool_calls:
+        logger.debug("未找到工具调用，结束对话")
         return END
+
+    tool_name = tool_calls[0].get("name")
+    if tool_name == "sql_db_query":
+        logger.debug("找到sql_db_query工具调用，继续到check_query")
+        return "check_query"
+
+    logger.debug(f"找到其他工具调用: {tool_name}，结束对话")
+    return END
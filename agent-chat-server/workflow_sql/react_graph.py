@@ -5,36 +5,86 @@
 """
 
 import logging
-import os
-# 修复相对导入问题
-import sys
-from typing import Any
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
 
 from langchain_core.language_models import BaseLanguageModel
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph import MessagesState
 
-from workflow_sql.config import AgentConfig
-from workflow_sql.database import SQLDatabaseManager
-from workflow_sql.tools import SQLToolManager
-from workflow_sql.react_tools import (
+from .agent_types import message_text
+from .config import AgentConfig
+from .database import SQLDatabaseManager, get_database_manager
+from .tools import SQLToolManager
+from .react_tools import (
     initialize_sql_tools, 
     get_sql_tools, 
     get_sql_system_prompt
 )
-from workflow_sql.cache_manager import initialize_cache
-from workflow_sql.async_chart_generator import run_async_chart_generation
 
 logger = logging.getLogger(__name__)
 
+# 判断消息是否包含SQL执行结果(忽略大小写, 无需先复制一份大写内容)
+_QUERY_RESULT_PATTERN = re.compile(r"SELECT|查询结果", re.IGNORECASE)
+
+# 表明回答包含数据查询结果、适合生成图表的关键词
+_CHART_DATA_KEYWORDS = (
+    '查询结果', '数据', '统计', '分析', '对比',
+    'select', 'count', 'sum', 'avg', 'max', 'min',
+    '平均', '总计', '最大', '最小', '排序',
+)
+_CHART_DATA_PATTERN = re.compile('|'.join(map(re.escape, _CHART_DATA_KEYWORDS)), re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class _ChartDataTracker:
+    """流式处理时增量记录图表生成所需的数据
+
+    每个流式块只检查新增的消息, 流结束后无需再扫描整个消息历史。
+    提取规则与 SQLReActAgent._extract_chart_data 相同。
+    """
+
+    user_question: Optional[str] = None  # 第一个人类消息
+    query_result: Optional[str] = None   # 最后一条包含SQL执行结果的消息
+    answer_content: Optional[str] = None # 最后一个AI消息
+    seen: int = 0                        # 已检查过的消息数量
+
+    def update(self, messages: List[Any]) -> None:
+        """检查自上次调用以来新增的消息
+
+        Args:
+            messages: 流式块中的完整消息列表
+        """
+        if len(messages) < self.seen:
+            # 消息列表被替换, 重新开始记录
+            self.user_question = self.query_result = self.answer_content = None
+            self.seen = 0
+
+        for message in messages[self.seen:]:
+            if getattr(message, 'content', None) is None:
+                continue
+
+            content = message_text(message)
+            message_type = getattr(message, 'type', None)
+            if message_type == 'human' and self.user_question is None:
+                self.user_question = content
+            if _QUERY_RESULT_PATTERN.search(content):
+                self.query_result = content
+            if message_type == 'ai':
+                self.answer_content = content
+        self.seen = len(messages)
+
+    def as_tuple(self) -> Tuple[str, str, str]:
+        """返回 (用户问题, 查询结果, 答案内容)"""
+        return self.user_question or "", self.query_result or "", self.answer_content or ""
+
 
 class SQLReActAgent:
     """基于ReAct模式的SQL智能体"""
+
+    __slots__ = ("config", "llm", "db_manager", "tool_manager", "tools", "agent")
     
     def __init__(
         self,
@@ -56,9 +106,6 @@ class SQLReActAgent:
         self.db_manager = db_manager
         self.tool_manager = tool_manager
         
-        # 初始化缓存
-        initialize_cache(ttl=3600, max_entries=100)
-        
         # 初始化SQL工具
         initialize_sql_tools(db_manager, tool_manager)
         
@@ -109,12 +156,12 @@ class SQLReActAgent:
             # 调用ReAct智能体
             result = self.agent.invoke(state)
             
-            # 检查是否需要生成图表
-            should_generate_chart = self._should_generate_chart(result)
+            # 检查是否需要生成图表, 需要时同时取得图表数据
+            chart_data = self._analyze_for_chart(result)
             
-            if should_generate_chart:
+            if chart_data is not None:
                 logger.info("检测到需要生成图表，启动异步图表生成")
-                chart_result = self._generate_chart_async(result)
+                chart_result = self._generate_chart_async(result, chart_data)
                 if chart_result:
                     # 将图表结果添加到响应中
                     result = self._append_chart_result(result, chart_result)
@@ -129,11 +176,48 @@ class SQLReActAgent:
             error_message = AIMessage(content=f"处理请求时出错: {str(e)}")
             return {"messages": state.get("messages", []) + [error_message]}
     
-    def stream(self, state: MessagesState, **kwargs):
+    async def ainvoke(self, state: MessagesState) -> MessagesState:
+        """异步调用智能体处理用户请求(LLM 等待期间不占用工作线程)
+
+        Args:
+            state: 包含用户消息的状态
+
+        Returns:
+            包含智能体响应的更新状态
+        """
+        try:
+            logger.info("开始异步处理SQL查询请求")
+
+            # 异步调用ReAct智能体
+            result = await self.agent.ainvoke(state)
+
+            # 检查是否需要生成图表, 需要时同时取得图表数据
+            chart_data = self._analyze_for_chart(result)
+            if chart_data is not None:
+                logger.info("检测到需要生成图表，启动异步图表生成")
+                chart_result = await self._agenerate_chart(result, chart_data)
+                if chart_result:
+                    # 将图表结果添加到响应中
+                    result = self._append_chart_result(result, chart_result)
+
+            logger.info("SQL查询请求异步处理完成")
+            return result
+
+        except Exception as e:
+            logger.error(f"异步处理SQL查询请求失败: {e}")
+            # 返回错误消息
+            from langchain_core.messages import AIMessage
+            error_message = AIMessage(content=f"处理请求时出错: {str(e)}")
+            return {"messages": state.get("messages", []) + [error_message]}
+
+    def stream(self, state: MessagesState, min_interval: float = 0.0, **kwargs):
         """流式处理用户请求
 
         Args:
             state: 包含用户消息的状态
+            min_interval: 两次输出之间的最小间隔(秒)。大于0时, 间隔内到达的完整状态快照
+                只输出最新的一个(后一个快照已包含前一个的全部消息), 最后一个快照总会输出;
+                默认0表示逐块输出
             **kwargs: 额外的流式处理参数
 
         Yields:
@@ -144,11 +228,35 @@ class SQLReActAgent:
 
             # 收集所有流式响应
             final_result = None
+            chart_data = _ChartDataTracker()  # 随流式块增量记录图表数据, 结束后无需重新扫描
+
+            pending = None  # 因间隔未到而暂存的最新快照
+            last_yield = 0.0
 
             # 使用ReAct智能体的流式处理
             for chunk in self.agent.stream(state, **kwargs):
                 final_result = chunk  # 保存最后的结果
-                yield chunk
+                messages = chunk.get("messages") if isinstance(chunk, dict) else None
+                if not isinstance(messages, list):
+                    yield chunk
+                    continue
+
+                chart_data.update(messages)
+                if min_interval <= 0:
+                    yield chunk
+                    continue
+
+                # 合并短时间内连续到达的快照, 减少下游序列化和推送次数
+                now = time.monotonic()
+                if now - last_yield >= min_interval:
+                    pending = None
+                    last_yield = now
+                    yield chunk
+                else:
+                    pending = chunk
+
+            if pending is not None:
+                yield pending
 
             # 检查是否需要生成图表
             if final_result:
@@ -156,7 +264,7 @@ class SQLReActAgent:
 
                 if should_generate_chart:
                     logger.info("检测到需要生成图表，启动异步图表生成")
-                    chart_result = self._generate_chart_async(final_result)
+                    chart_result = self._generate_chart_async(final_result, chart_data.as_tuple())
                     if chart_result:
                         # 将图表结果作为额外的流式响应返回
                         chart_chunk = self._append_chart_result(final_result, chart_result)
@@ -168,6 +276,47 @@ class SQLReActAgent:
             from langchain_core.messages import AIMessage
             error_message = AIMessage(content=f"流式处理时出错: {str(e)}")
             yield {"messages": state.get("messages", []) + [error_message]}
+
+    async def astream(self, state: MessagesState, **kwargs):
+        """异步流式处理用户请求
+
+        与 stream 输出相同, 但在当前事件循环中运行: 智能体和图表生成都直接 await,
+        不占用工作线程, 也不经由后台事件循环线程转发。
+
+        Args:
+            state: 包含用户消息的状态
+            **kwargs: 额外的流式处理参数
+
+        Yields:
+            流式响应数据
+        """
+        try:
+            logger.info("开始异步流式处理SQL查询请求")
+
+            final_result = None
+            chart_data = _ChartDataTracker()  # 随流式块增量记录图表数据, 结束后无需重新扫描
+
+            async for chunk in self.agent.astream(state, **kwargs):
+                final_result = chunk  # 保存最后的结果
+                messages = chunk.get("messages") if isinstance(chunk, dict) else None
+                if isinstance(messages, list):
+                    chart_data.update(messages)
+                yield chunk
+
+            # 检查是否需要生成图表
+            if final_result and self._should_generate_chart(final_result):
+                logger.info("检测到需要生成图表，启动异步图表生成")
+                chart_result = await self._agenerate_chart(final_result, chart_data.as_tuple())
+                if chart_result:
+                    # 将图表结果作为额外的流式响应返回
+                    yield self._append_chart_result(final_result, chart_result)
+
+        except Exception as e:
+            logger.error(f"异步流式处理SQL查询请求失败: {e}")
+            # 返回错误消息
+            from langchain_core.messages import AIMessage
+            error_message = AIMessage(content=f"流式处理时出错: {str(e)}")
+            yield {"messages": state.get("messages", []) + [error_message]}
     
     def _should_generate_chart(self, result: MessagesState) -> bool:
         """判断是否需要生成图表
@@ -185,42 +334,57 @@ class SQLReActAgent:
                 return False
             
             last_message = messages[-1]
-            if not hasattr(last_message, 'content'):
+            if getattr(last_message, 'content', None) is None:
                 return False
             
-            content = last_message.content.lower()
-            
-            # 检查是否包含数据相关的关键词
-            chart_keywords = [
-                '查询结果', '数据', '统计', '分析', '对比', 
-                'select', 'count', 'sum', 'avg', 'max', 'min',
-                '平均', '总计', '最大', '最小', '排序'
-            ]
-            
-            return any(keyword in content for keyword in chart_keywords)
+            # 检查是否包含数据相关的关键词(一次正则扫描, 无需复制小写内容)
+            return _CHART_DATA_PATTERN.search(message_text(last_message)) is not None
             
         except Exception as e:
             logger.error(f"判断是否生成图表时出错: {e}")
             return False
     
-    def _generate_chart_async(self, result: MessagesState) -> str:
+    def _analyze_for_chart(self, result: MessagesState) -> Optional[Tuple[str, str, str]]:
+        """判断是否需要生成图表, 需要时一并提取图表数据
+
+        供 invoke/ainvoke 使用: 判断和提取在一次调用中完成, 不需要生成图表时不遍历消息历史。
+
+        Args:
+            result: 智能体的响应结果
+
+        Returns:
+            需要生成图表时返回 (用户问题, 查询结果, 答案内容), 否则返回None
+        """
+        if not self._should_generate_chart(result):
+            return None
+        return self._extract_chart_data(result["messages"])
+
+    def _generate_chart_async(
+        self,
+        result: MessagesState,
+        chart_data: Optional[Tuple[str, str, str]] = None
+    ) -> str:
         """异步生成图表
         
         Args:
             result: 智能体的响应结果
+            chart_data: 已提取的 (用户问题, 查询结果, 答案内容), 为None时从消息中提取
             
         Returns:
             图表生成结果
         """
         try:
             # 提取用户问题和查询结果
-            user_question, query_result, answer_content = self._extract_chart_data(result["messages"])
+            if chart_data is None:
+                chart_data = self._extract_chart_data(result["messages"])
+            user_question, query_result, answer_content = chart_data
             
             if not user_question or not query_result:
                 logger.warning("无法提取图表生成所需的数据")
                 return ""
             
-            # 调用异步图表生成
+            # 调用异步图表生成(图表模块在首次生成图表时才导入)
+            from .async_chart_generator import run_async_chart_generation
             chart_result = run_async_chart_generation(
                 user_question=user_question,
                 query_result=query_result,
@@ -234,6 +398,38 @@ class SQLReActAgent:
             logger.error(f"异步图表生成失败: {e}")
             return f"图表生成失败: {str(e)}"
     
+    async def _agenerate_chart(
+        self,
+        result: MessagesState,
+        chart_data: Optional[Tuple[str, str, str]] = None
+    ) -> str:
+        """在当前事件循环中生成图表(供 ainvoke/astream 使用, 不再嵌套 run_until_complete)
+
+        Args:
+            result: 智能体的响应结果
+            chart_data: 已提取的 (用户问题, 查询结果, 答案内容), 为None时从消息中提取
+
+        Returns:
+            图表生成结果
+        """
+        try:
+            # 提取用户问题和查询结果
+            if chart_data is None:
+                chart_data = self._extract_chart_data(result["messages"])
+            user_question, query_result, answer_content = chart_data
+
+            if not user_question or not query_result:
+                logger.warning("无法提取图表生成所需的数据")
+                return ""
+
+            from .async_chart_generator import get_chart_generator
+            generator = get_chart_generator(self.llm)
+            return await generator.generate_chart(user_question, query_result, answer_content)
+
+        except Exception as e:
+            logger.error(f"异步图表生成失败: {e}")
+            return f"图表生成失败: {str(e)}"
+
     def _extract_chart_data(self, messages):
         """从消息中提取图表生成所需的数据
         
@@ -243,30 +439,35 @@ class SQLReActAgent:
         Returns:
             (用户问题, 查询结果, 答案内容)
         """
-        user_question = ""
-        query_result = ""
-        answer_content = ""
-        
         try:
-            for message in messages:
-                if not hasattr(message, 'content'):
+            # 提取用户问题（第一个人类消息）: 从前向后, 命中即停止
+            user_question = next(
+                (message_text(message) for message in messages
+                 if getattr(message, 'type', None) == 'human' and getattr(message, 'content', None) is not None),
+                "",
+            )
+
+            # 查询结果和最终答案都取最后一条, 从后向前查找, 两者都找到后停止
+            query_result: Optional[str] = None
+            answer_content: Optional[str] = None
+            for message in reversed(messages):
+                if getattr(message, 'content', None) is None:
                     continue
-                
-                content = str(message.content) if not isinstance(message.content, str) else message.content
-                
-                # 提取用户问题（第一个人类消息）
-                if hasattr(message, 'type') and message.type == 'human' and not user_question:
-                    user_question = content
-                
+
+                content = message_text(message)
+
                 # 提取查询结果（包含SQL执行结果的消息）
-                if 'SELECT' in content.upper() or '查询结果' in content:
+                if query_result is None and _QUERY_RESULT_PATTERN.search(content):
                     query_result = content
-                
+
                 # 提取最终答案（最后一个AI消息）
-                if hasattr(message, 'type') and message.type == 'ai':
+                if answer_content is None and getattr(message, 'type', None) == 'ai':
                     answer_content = content
-            
-            return user_question, query_result, answer_content
+
+                if query_result is not None and answer_content is not None:
+                    break
+
+            return user_question, query_result or "", answer_content or ""
             
         except Exception as e:
             logger.error(f"提取图表数据失败: {e}")
@@ -288,11 +489,9 @@ class SQLReActAgent:
             # 创建图表消息
             chart_message = AIMessage(content=f"\n\n📊 数据可视化：\n{chart_result}")
             
-            # 添加到消息列表
-            messages = result.get("messages", [])
-            messages.append(chart_message)
-            
-            return {"messages": messages}
+            # 返回新的消息列表, 不修改智能体结果(流式处理时即已输出的快照)中的原列表;
+            # 仍需包含全部消息: invoke 的返回值作为外层图节点的更新, stream 输出完整状态快照
+            return {**result, "messages": [*result.get("messages", []), chart_message]}
             
         except Exception as e:
             logger.error(f"添加图表结果失败: {e}")
@@ -313,7 +512,8 @@ def create_sql_react_agent(config: AgentConfig, llm: BaseLanguageModel) -> SQLRe
     
     try:
         # 创建管理器
-        db_manager = SQLDatabaseManager(config.database)
+        db_manager = get_database_manager(config.database)
+        db_manager.warm_up()  # 预先建立连接, 首个请求无需等待连接和表名查询
         tool_manager = SQLToolManager(db_manager, llm)
         
         # 创建智能体
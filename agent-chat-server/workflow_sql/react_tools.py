@@ -5,33 +5,41 @@
 """
 
 import logging
-import os
-# 修复相对导入问题
-import sys
+from functools import lru_cache
 from typing import List, Optional, Any
 
 from langchain_core.tools import tool
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
-from workflow_sql.database import SQLDatabaseManager
-from workflow_sql.tools import SQLToolManager
-from workflow_sql.cache_manager import (
-    get_cached_tables_list, cache_tables_list,
-    get_cached_table_schema, cache_table_schema,
+from .agent_types import QueryExecutionError
+from .database import SQLDatabaseManager
+from .tools import SQLToolManager
+from .cache_manager import (
+    get_cached_tables_text, cache_tables_list,
     get_cached_database_info, cache_database_info,
     clear_all_cache, get_cache_stats
 )
 
 logger = logging.getLogger(__name__)
 
+# 问题复杂度分析关键词: 简单查询和复杂查询两类(均为小写)
+_SIMPLE_KEYWORDS = frozenset(['多少', 'count', '总数', '数量', '有几个', '列出', 'list', 'show'])
+_COMPLEX_KEYWORDS = frozenset(['平均', 'average', '最大', 'max', '最小', 'min', '分组', 'group',
+                               '排序', 'order', '连接', 'join', '比较', '分析', '统计'])
+# 规范化问题时去除的结尾标点(关键词中不含这些字符, 去除后不影响匹配)
+_TRAILING_PUNCTUATION = "?？。.!！"
+
 # 全局变量，用于管理器实例
 _db_manager: Optional[SQLDatabaseManager] = None
 _tool_manager: Optional[SQLToolManager] = None
 
+# get_database_tables 每次发出的工具调用完全相同, 定义一次后复用
+_LIST_TABLES_TOOL_CALL = {
+    "name": "sql_db_list_tables",
+    "args": {},
+    "id": "get_tables_call",
+    "type": "tool_call",
+}
+
 
 def initialize_sql_tools(db_manager: SQLDatabaseManager, tool_manager: SQLToolManager) -> None:
     """初始化SQL工具的全局管理器
@@ -53,35 +61,31 @@ def get_database_tables() -> str:
     Returns:
         包含所有表名的字符串，用逗号分隔
     """
-    global _tool_manager
+    global _db_manager, _tool_manager
+
+    if _db_manager is None or _tool_manager is None:
+        return "错误: SQL工具管理器未初始化"
 
     # 检查缓存
-    cached_tables = get_cached_tables_list()
+    cache_scope = _db_manager.cache_scope
+    cached_tables = get_cached_tables_text(cache_scope)
     if cached_tables is not None:
-        logger.info(f"使用缓存的表列表: {cached_tables}")
-        return ", ".join(cached_tables)
-
-    if _tool_manager is None:
-        return "错误: SQL工具管理器未初始化"
+        logger.info("使用缓存的表列表: %s", cached_tables)
+        return cached_tables or "未找到任何表"
 
     try:
         # 调用底层工具
         list_tables_tool = _tool_manager.get_list_tables_tool()
-        tool_call = {
-            "name": "sql_db_list_tables",
-            "args": {},
-            "id": "get_tables_call",
-            "type": "tool_call",
-        }
-        result = list_tables_tool.invoke(tool_call)
+        result = list_tables_tool.invoke(_LIST_TABLES_TOOL_CALL)
 
         # 缓存结果
         if result.content:
             tables_list = [table.strip() for table in result.content.split(',')]
-            cache_tables_list(tables_list)
-            logger.info(f"获取并缓存表列表: {tables_list}")
+            cache_tables_list(cache_scope, tables_list, _db_manager.config.schema_ttl_factor)
+            logger.info("获取并缓存表列表: %s", tables_list)
             return result.content
         else:
+            cache_tables_list(cache_scope, [], _db_manager.config.schema_ttl_factor)  # 空结果同样缓存(较短TTL), 避免重复查询
             return "未找到任何表"
 
     except Exception as e:
@@ -99,33 +103,19 @@ def get_table_schema(table_names: str = "") -> str:
     Returns:
         表结构信息的详细描述
     """
-    global _tool_manager
-
-    # 检查缓存
-    cached_schema = get_cached_table_schema(table_names)
-    if cached_schema is not None:
-        logger.info(f"使用缓存的表结构: {table_names or 'all_tables'}")
-        return cached_schema
+    global _db_manager
 
-    if _tool_manager is None:
+    if _db_manager is None:
         return "错误: SQL工具管理器未初始化"
 
     try:
-        # 调用底层工具
-        schema_tool = _tool_manager.get_schema_tool()
-        tool_call = {
-            "name": "sql_db_schema",
-            "args": {"table_names": table_names},
-            "id": "get_schema_call",
-            "type": "tool_call",
-        }
-        result = schema_tool.invoke(tool_call)
+        # 一次批量获取所有请求表的结构; 与数据库管理器共用按规范化表名缓存的结果
+        names = [name.strip() for name in table_names.split(",") if name.strip()]
+        schema = _db_manager.get_table_schema(names or None)
 
-        # 缓存结果
-        if result.content:
-            cache_table_schema(table_names, result.content)
-            logger.info(f"获取并缓存表结构: {table_names or 'all_tables'}")
-            return result.content
+        if schema:
+            logger.info("获取表结构: %s", table_names or 'all_tables')
+            return schema
         else:
             return "未找到表结构信息"
 
@@ -144,33 +134,28 @@ def execute_sql_query(query: str) -> str:
     Returns:
         查询结果，如果出错则返回错误信息
     """
-    global _tool_manager, _db_manager
+    global _db_manager
     
-    if _tool_manager is None:
+    if _db_manager is None:
         return "错误: SQL工具管理器未初始化"
     
     if not query.strip():
         return "错误: 查询语句不能为空"
     
     try:
-        logger.info(f"执行SQL查询: {query}")
+        logger.info("执行SQL查询: %s", query)
         
-        # 调用底层工具
-        query_tool = _tool_manager.get_query_tool()
-        tool_call = {
-            "name": "sql_db_query",
-            "args": {"query": query},
-            "id": "execute_query_call",
-            "type": "tool_call",
-        }
-        result = query_tool.invoke(tool_call)
+        # 经由数据库管理器执行, 相同的只读查询直接返回缓存结果
+        result = _db_manager.execute_query(query)
         
-        if result.content:
+        if result:
             logger.info("SQL查询执行成功")
-            return result.content
+            return result
         else:
             return "查询执行成功，但没有返回结果"
             
+    except QueryExecutionError as e:
+        return str(e)
     except Exception as e:
         logger.error(f"SQL查询执行失败: {e}")
         return f"查询执行失败: {str(e)}"
@@ -185,15 +170,15 @@ def get_database_info() -> str:
     """
     global _db_manager
 
+    if _db_manager is None:
+        return "错误: 数据库管理器未初始化"
+
     # 检查缓存
-    cached_info = get_cached_database_info()
+    cached_info = get_cached_database_info(_db_manager.cache_scope)
     if cached_info is not None:
         logger.info("使用缓存的数据库信息")
         return cached_info
 
-    if _db_manager is None:
-        return "错误: 数据库管理器未初始化"
-
     try:
         dialect = _db_manager.get_dialect()
         table_count = len(_db_manager.get_table_names())
@@ -205,7 +190,7 @@ def get_database_info() -> str:
 - 最大查询结果数: {_db_manager.config.max_query_results}"""
 
         # 缓存结果
-        cache_database_info(info)
+        cache_database_info(_db_manager.cache_scope, info, _db_manager.config.schema_ttl_factor)
         logger.info("获取并缓存数据库信息")
         return info
 
@@ -250,17 +235,9 @@ def get_sql_tools() -> List[Any]:
     """获取所有SQL相关的工具列表
 
     Returns:
-        SQL工具列表
+        SQL工具列表(每次返回新列表, 工具对象本身在所有调用间共享)
     """
-    return [
-        analyze_query_complexity,
-        get_database_tables,
-        get_table_schema,
-        execute_sql_query,
-        get_database_info,
-        clear_cache,
-        get_cache_status,
-    ]
+    return list(_SQL_TOOLS)
 
 
 @tool
@@ -273,16 +250,17 @@ def analyze_query_complexity(question: str) -> str:
     Returns:
         问题复杂度分析和建议的查询策略
     """
-    question_lower = question.lower()
+    # 规范化后作为缓存键: 仅大小写、空白或结尾标点不同的问题共用同一条结果
+    return _analyze_complexity(" ".join(question.split()).rstrip(_TRAILING_PUNCTUATION).lower())
 
-    # 简单查询关键词
-    simple_keywords = ['多少', 'count', '总数', '数量', '有几个', '列出', 'list', 'show']
-    # 复杂查询关键词
-    complex_keywords = ['平均', 'average', '最大', 'max', '最小', 'min', '分组', 'group',
-                       '排序', 'order', '连接', 'join', '比较', '分析', '统计']
 
-    simple_score = sum(1 for keyword in simple_keywords if keyword in question_lower)
-    complex_score = sum(1 for keyword in complex_keywords if keyword in question_lower)
+@lru_cache(maxsize=256)
+def _analyze_complexity(question: str) -> str:
+    """分析问题复杂度(相同问题直接返回缓存结果)"""
+    # 逐个关键词做子串判断(每个关键词只计一次); 关键词之间可能重叠(如"总数"与"数量"),
+    # 不能用一次不重叠的正则扫描代替
+    simple_score = sum(keyword in question for keyword in _SIMPLE_KEYWORDS)
+    complex_score = sum(keyword in question for keyword in _COMPLEX_KEYWORDS)
 
     if simple_score > complex_score and simple_score > 0:
         strategy = "简单查询策略：可以直接构造SQL查询，可能需要基本的表信息"
@@ -297,13 +275,20 @@ def analyze_query_complexity(question: str) -> str:
     return f"问题复杂度: {complexity}\n建议策略: {strategy}"
 
 
-def get_sql_system_prompt() -> str:
-    """获取SQL智能体的系统提示词
+# 所有SQL工具(模块导入时确定, 顺序即提供给智能体的顺序)
+_SQL_TOOLS = (
+    analyze_query_complexity,
+    get_database_tables,
+    get_table_schema,
+    execute_sql_query,
+    get_database_info,
+    clear_cache,
+    get_cache_status,
+)
 
-    Returns:
-        专门为SQL查询优化的系统提示词
-    """
-    return """# SQL数据库智能助手 v2.0
+
+# SQL智能体的系统提示词(模块级常量, 所有智能体实例共用同一个字符串对象)
+_SQL_SYSTEM_PROMPT = """# SQL数据库智能助手 v2.0
 
 你是一个高度智能的SQL数据库助手，专门设计用于高效、准确地处理各种复杂度的数据库查询任务。
 
@@ -413,3 +398,12 @@ def get_sql_system_prompt() -> str:
 - ✅ 保持高效的执行性能
 
 记住：你的价值在于将复杂的数据库操作转化为简单易懂的业务洞察。始终以用户的业务目标为导向，提供最有价值的数据分析。"""
+
+
+def get_sql_system_prompt() -> str:
+    """获取SQL智能体的系统提示词
+
+    Returns:
+        专门为SQL查询优化的系统提示词
+    """
+    return _SQL_SYSTEM_PROMPT
@@ -4,33 +4,33 @@
 本模块提供SQL数据库工具和其他实用程序的管理功能。
 """
 
+from __future__ import annotations
+
 import logging
-import os
-# 修复相对导入问题，使用绝对导入
-import sys
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.tools import BaseTool
 from langgraph.prebuilt import ToolNode
 
-# 添加当前目录到Python路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+from .database import SQLDatabaseManager  # 数据库管理器
+from .agent_types import ToolNotFoundError  # 工具异常类型
 
-from workflow_sql.database import SQLDatabaseManager  # 数据库管理器
-from workflow_sql.agent_types import ToolNotFoundError  # 工具异常类型
+if TYPE_CHECKING:
+    from langchain_community.agent_toolkits import SQLDatabaseToolkit
 
 
 logger = logging.getLogger(__name__)
 
+# 构建SQL智能体图所必需的工具
+_REQUIRED_TOOLS = ("sql_db_schema", "sql_db_query", "sql_db_list_tables")
+
 
 class SQLToolManager:
     """SQL数据库工具和工具节点管理器"""
 
+    __slots__ = ("db_manager", "llm", "_toolkit", "_tools", "_tools_by_name", "_tool_nodes")
+
     def __init__(self, db_manager: SQLDatabaseManager, llm: BaseLanguageModel) -> None:
         """初始化工具管理器
 
@@ -42,6 +42,7 @@ class SQLToolManager:
         self.llm = llm
         self._toolkit: Optional[SQLDatabaseToolkit] = None
         self._tools: Optional[List[BaseTool]] = None
+        self._tools_by_name: dict[str, BaseTool] = {}  # 工具名 -> 工具, 与 _tools 同时创建
         self._tool_nodes: dict[str, ToolNode] = {}
 
     @property
@@ -54,13 +55,17 @@ class SQLToolManager:
     def _create_toolkit(self) -> None:
         """创建SQL数据库工具包"""
         try:
+            # langchain_community 较重, 在首次创建工具包时才导入
+            from langchain_community.agent_toolkits import SQLDatabaseToolkit
+
             logger.info("开始创建SQL数据库工具包...")  # 优化开始日志
             self._toolkit = SQLDatabaseToolkit(
                 db=self.db_manager.db,
                 llm=self.llm
             )
             self._tools = self._toolkit.get_tools()
-            tool_names = [tool.name for tool in self._tools]  # 获取工具名称列表
+            self._tools_by_name = {tool.name: tool for tool in self._tools}
+            tool_names = list(self._tools_by_name)  # 获取工具名称列表
             logger.info(f"SQL工具包创建成功 - 包含 {len(self._tools)} 个工具: {tool_names}")  # 增强成功日志
         except Exception as e:
             logger.error(f"SQL工具包创建失败 - 错误详情: {e}")  # 统一错误日志格式
@@ -81,14 +86,15 @@ class SQLToolManager:
         Returns:
             如果找到则返回工具，否则返回None
         """
-        tools = self.get_all_tools()
-        for tool in tools:
-            if tool.name == name:
-                logger.debug(f"找到工具: {name}")
-                return tool
+        if self._tools is None:
+            self._create_toolkit()
 
-        logger.warning(f"未找到工具: {name}")
-        return None
+        tool = self._tools_by_name.get(name)
+        if tool is None:
+            logger.warning("未找到工具: %s", name)
+        else:
+            logger.debug("找到工具: %s", name)
+        return tool
 
     def get_required_tool(self, name: str) -> BaseTool:
         """按名称获取必需工具，如果未找到则抛出错误
@@ -109,7 +115,7 @@ class SQLToolManager:
             raise ToolNotFoundError(
                 f"未找到必需工具 '{name}'。可用工具: {available_tools}"
             )
-        logger.debug(f"工具获取成功 - 工具名称: '{name}'")  # 添加成功日志
+        logger.debug("工具获取成功 - 工具名称: '%s'", name)  # 添加成功日志
         return tool
 
     def get_schema_tool(self) -> BaseTool:
@@ -137,12 +143,14 @@ class SQLToolManager:
         if node_name is None:
             node_name = tool_name
 
-        if node_name not in self._tool_nodes:
+        # 命中时只做一次字典查找
+        tool_node = self._tool_nodes.get(node_name)
+        if tool_node is None:
             tool = self.get_required_tool(tool_name)
-            self._tool_nodes[node_name] = ToolNode([tool], name=node_name)
+            tool_node = self._tool_nodes[node_name] = ToolNode([tool], name=node_name)
             logger.debug(f"创建工具节点: {node_name}")
 
-        return self._tool_nodes[node_name]
+        return tool_node
 
     def get_schema_node(self) -> ToolNode:
         """获取结构工具节点"""
@@ -160,7 +168,7 @@ class SQLToolManager:
         """
         tools = self.get_all_tools()
         tool_names = [tool.name for tool in tools]
-        logger.debug(f"可用工具: {tool_names}")
+        logger.debug("可用工具: %s", tool_names)
         return tool_names
 
     def validate_tools(self) -> bool:
@@ -169,10 +177,10 @@ class SQLToolManager:
         Returns:
             如果所有必需工具都可用则返回True，否则返回False
         """
-        required_tools = ["sql_db_schema", "sql_db_query", "sql_db_list_tables"]
-        available_tools = self.list_available_tools()
+        if self._tools is None:
+            self._create_toolkit()
 
-        missing_tools = [tool for tool in required_tools if tool not in available_tools]
+        missing_tools = [tool for tool in _REQUIRED_TOOLS if tool not in self._tools_by_name]
 
         if missing_tools:
             logger.error(f"缺少必需工具: {missing_tools}")